@@ -1,6 +1,6 @@
 from django.contrib import admin
 from taggit.models import Tag  # для фильтрации по тегам
-from .models import User, Product, Address, Order, ChatRoom, Message, Report
+from .models import User, Product, Address, Order, OrderItem, PaymentJob, ChatRoom, Message, Report
 
 
 @admin.register(User)
@@ -21,11 +21,27 @@ class ProductAdmin(admin.ModelAdmin):
     readonly_fields = ('views',)
 
 
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    readonly_fields = ('product', 'title', 'price', 'quantity')
+    can_delete = False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('transaction_id', 'user', 'status', 'total_amount', 'created_at')
     list_filter = ('status',)
     search_fields = ('transaction_id', 'user__username')
+    inlines = (OrderItemInline,)
+
+
+@admin.register(PaymentJob)
+class PaymentJobAdmin(admin.ModelAdmin):
+    list_display = ('order', 'status', 'attempts', 'run_at', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('idempotency_key',)
+    readonly_fields = ('order', 'idempotency_key', 'attempts')
 
 
 # Регистрируем остальные модели без особой кастомизации:
@@ -0,0 +1,230 @@
+import hashlib
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import JsonResponse
+from django.urls import get_script_prefix, reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+
+from .catalog import filter_products
+from .facets import selected_tags
+from .forms import CatalogFilterForm
+from .models import Product, User
+from .pagination import PAGE_SIZE, paginate_keyset, set_page_urls
+
+# JSON API каталога только для чтения: /api/v1/products/, /api/v1/products/<id>/,
+# /api/v1/sellers/<username>/. Набор полей задаётся ?fields=id,title,price —
+# из БД читаются только нужные столбцы (only), продавец — JOIN-ом, теги —
+# одним запросом на страницу. ETag и Last-Modified строятся по updated_at
+# (и счётчикам просмотров/отзывов, которые updated_at не трогают), поэтому
+# повторный запрос клиента получает 304 без сериализации. Ответ — компактный
+# JSON в UTF-8, gzip-сжатие включено для этих представлений.
+API_VERSION = 'v1'
+API_MAX_LIMIT = getattr(settings, 'CATALOG_API_MAX_LIMIT', 100)
+API_MAX_AGE = getattr(settings, 'CATALOG_API_MAX_AGE', 60)
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def _rating(product):
+    return {'avg': str(product.rating_avg), 'count': product.rating_count}
+
+
+# URL товара и его миниатюры зависят только от id и имени файла, а их
+# вычисление — reverse() и хэш спецификации imagekit — дороже всей остальной
+# сериализации, поэтому результаты запоминаются
+_ID_PLACEHOLDER = 987654321
+
+
+@lru_cache(maxsize=8)
+def _detail_url_template(script_prefix):
+    return reverse('product_detail', args=[_ID_PLACEHOLDER]).replace(str(_ID_PLACEHOLDER), '{}')
+
+
+def _detail_url(product):
+    return _detail_url_template(get_script_prefix()).format(product.pk)
+
+
+@lru_cache(maxsize=getattr(settings, 'CATALOG_API_THUMBNAIL_CACHE_SIZE', 50000))
+def _thumbnail_url(image_name):
+    return Product(image=image_name).image_320.url
+
+
+def _seller(product):
+    return {'id': product.seller_id, 'username': product.seller.username}
+
+
+# поле ответа -> (столбцы для only(), функция сериализации)
+FIELDS = {
+    'id': (('id',), lambda p: p.id),
+    'title': (('title',), lambda p: p.title),
+    'description': (('description',), lambda p: p.description),
+    'price': (('price',), lambda p: str(p.price)),
+    'status': (('status',), lambda p: p.status),
+    'created_at': (('created_at',), lambda p: p.created_at.isoformat()),
+    'updated_at': (('updated_at',), lambda p: p.updated_at.isoformat()),
+    'views': (('views',), lambda p: p.views),
+    'rating': (('rating_avg', 'rating_count'), _rating),
+    'image': (('image',), lambda p: p.image.url if p.image else None),
+    'thumbnail': (('image',), lambda p: _thumbnail_url(p.image.name) if p.image else None),
+    'url': (('id',), _detail_url),
+    'seller': (('seller', 'seller__username'), _seller),
+    'tags': ((), lambda p: [tag.name for tag in p.tags.all()]),
+}
+LIST_FIELDS = ('id', 'title', 'price', 'status', 'thumbnail', 'rating', 'seller', 'updated_at')
+DETAIL_FIELDS = tuple(FIELDS)
+# из них строится ETag, поэтому читаются всегда
+ETAG_COLUMNS = ('id', 'updated_at', 'views', 'rating_count')
+
+
+class ApiError(Exception):
+    def __init__(self, errors, status=400):
+        super().__init__(errors)
+        self.errors = errors
+        self.status = status
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def parse_fields(request, default):
+    raw = request.GET.get('fields')
+    if not raw:
+        return default
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise ApiError({'fields': [f"Неизвестные поля: {', '.join(unknown)}" if unknown else "Пустой список"]})
+    return fields
+
+
+def parse_limit(request):
+    raw = request.GET.get('limit')
+    if not raw:
+        return PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= API_MAX_LIMIT:
+        raise ApiError({'limit': [f"Целое число от 1 до {API_MAX_LIMIT}"]})
+    return limit
+
+
+def product_queryset(fields, extra_columns=()):
+    columns = set(ETAG_COLUMNS) | set(extra_columns)
+    for name in fields:
+        columns.update(FIELDS[name][0])
+    queryset = Product.objects.filter(is_active=True)
+    if 'seller' in fields:
+        queryset = queryset.select_related('seller')
+    return queryset.only(*columns)
+
+
+def serialize_products(products, fields):
+    serializers = [(name, FIELDS[name][1]) for name in fields]
+    return [{name: serialize(product) for name, serialize in serializers} for product in products]
+
+
+def _validators(products, fields):
+    digest = hashlib.md5(f'{API_VERSION}|{",".join(fields)}'.encode())
+    for product in products:
+        digest.update(f'|{product.pk}:{product.updated_at.timestamp()}:{product.views}:{product.rating_count}'.encode())
+    last_modified = max((product.updated_at for product in products), default=None)
+    return f'"{digest.hexdigest()}"', last_modified and last_modified.timestamp()
+
+
+def conditional_api_response(request, products, fields, build):
+    """
+    304, если у клиента актуальная версия; иначе build() — данные ответа.
+    Теги подгружаются только когда ответ действительно сериализуется.
+    """
+    etag, last_modified = _validators(products, fields)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if 'tags' in fields:
+            prefetch_related_objects(products, 'tags')
+        response = api_response(build())
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = f'public, max-age={API_MAX_AGE}'
+    return response
+
+
+def product_page(request, fields, seller=None):
+    form = CatalogFilterForm(request.GET)
+    if not form.is_valid():
+        raise ApiError(form.errors)
+    filters = form.filters
+    if seller is not None:
+        filters['seller'] = seller.pk
+    _, order_field, descending = form.ordering
+    limit = parse_limit(request)
+    queryset = filter_products(product_queryset(fields, [order_field]), filters, selected_tags(request))
+    page = paginate_keyset(queryset, order_field, request.GET.get('cursor'), limit, descending)
+    set_page_urls(request, page)
+    return page
+
+
+def _absolute(request, query):
+    return request.build_absolute_uri(request.path + query) if query else None
+
+
+def api_view(view):
+    """require_safe + gzip, ошибки ApiError — JSON с нужным статусом."""
+    @gzip_page
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return api_response({'errors': error.errors}, status=error.status)
+    return wrapper
+
+
+@api_view
+def product_list(request):
+    """Активные товары с фильтрами каталога (см. CatalogFilterForm), ?tag= и курсором."""
+    fields = parse_fields(request, LIST_FIELDS)
+    page = product_page(request, fields)
+    return conditional_api_response(request, page.object_list, fields, lambda: {
+        'results': serialize_products(page, fields),
+        'next': _absolute(request, page.next_url),
+        'previous': _absolute(request, page.previous_url),
+    })
+
+
+@api_view
+def product_detail(request, product_id):
+    fields = parse_fields(request, DETAIL_FIELDS)
+    product = product_queryset(fields).filter(pk=product_id).first()
+    if product is None:
+        raise ApiError({'detail': "Товар не найден"}, status=404)
+    return conditional_api_response(request, [product], fields, lambda: serialize_products([product], fields)[0])
+
+
+@api_view
+def seller_products(request, username):
+    """Витрина продавца: профиль и его активные товары с теми же фильтрами."""
+    seller = User.objects.filter(username=username).only('id', 'username', 'date_joined').first()
+    if seller is None:
+        raise ApiError({'detail': "Продавец не найден"}, status=404)
+    fields = parse_fields(request, LIST_FIELDS)
+    page = product_page(request, fields, seller=seller)
+    return conditional_api_response(request, page.object_list, fields, lambda: {
+        'seller': {
+            'id': seller.pk,
+            'username': seller.username,
+            'date_joined': seller.date_joined.isoformat(),
+            'url': reverse('public_profile', args=[seller.username]),
+        },
+        'results': serialize_products(page, fields),
+        'next': _absolute(request, page.next_url),
+        'previous': _absolute(request, page.previous_url),
+    })
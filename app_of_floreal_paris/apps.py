@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppOfFlorealParisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_of_floreal_paris'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+from django.contrib.contenttypes.models import ContentType
+from taggit.models import Tag, TaggedItem
+
+from .models import Product
+
+# Помощники для массовой загрузки товаров (import_products, seed_marketplace):
+# теги находятся и создаются пачкой, а не get_or_create на каждую строку.
+
+
+def parse_tags(value):
+    if isinstance(value, (list, tuple)):
+        names = value
+    else:
+        names = (value or '').split(',')
+    return [name.strip() for name in names if name and name.strip()]
+
+
+def resolve_tags(names):
+    """
+    {имя тега: id} для всех names; недостающие теги создаются bulk_create.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - tag_ids.keys()
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=Tag().slugify(name)) for name in missing],
+            ignore_conflicts=True,
+        )
+        tag_ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+        # совпавший slug у другого имени — пусть taggit подберёт суффикс сам
+        for name in missing - tag_ids.keys():
+            tag_ids[name] = Tag.objects.create(name=name).id
+    return tag_ids
+
+
+def bulk_tag_products(product_tags):
+    """
+    product_tags: [(product, [имена тегов]), ...] для уже сохранённых товаров.
+    """
+    tag_ids = resolve_tags(name for _, names in product_tags for name in names)
+    content_type = ContentType.objects.get_for_model(Product)
+    TaggedItem.objects.bulk_create([
+        TaggedItem(content_type=content_type, object_id=product.pk, tag_id=tag_ids[name])
+        for product, names in product_tags
+        for name in set(names)
+    ], ignore_conflicts=True)
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from .models import CartItem
+
+# Сводка корзины (кол-во и сумма) для шапки сайта хранится в кэше Django
+# отдельно для каждого пользователя и сбрасывается сигналами (см. signals.py).
+CART_SUMMARY_KEY = 'cart_summary:{user_id}'
+CART_SUMMARY_TIMEOUT = getattr(settings, 'CART_SUMMARY_CACHE_TIMEOUT', 60 * 15)
+
+
+def cart_summary_key(user_id):
+    return CART_SUMMARY_KEY.format(user_id=user_id)
+
+
+def compute_cart_summary(user_id):
+    """
+    Считает сводку активной корзины одним агрегирующим запросом.
+    Корзину при этом не создаёт — если её нет, вернутся нули.
+    """
+    totals = CartItem.objects.filter(
+        cart__user_id=user_id,
+        cart__is_active=True,
+    ).aggregate(
+        count=Sum('quantity'),
+        total=Sum(F('quantity') * F('product__price')),
+    )
+    return {
+        'cart_count': totals['count'] or 0,
+        'cart_total': totals['total'] or 0,
+    }
+
+
+def get_cart_summary(user_id):
+    key = cart_summary_key(user_id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_cart_summary(user_id)
+        cache.set(key, summary, CART_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_cart_summary(*user_ids):
+    keys = [cart_summary_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,70 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .facets import filter_by_tags, get_tag_facets
+from .models import Product
+from .page_cache import get_version
+from .pagination import PAGE_SIZE, paginate_keyset, set_page_urls
+
+# Выборка каталога по фильтрам CatalogFilterForm и тегам. Каждый фильтр —
+# простое условие по столбцу Product, а сортировки покрыты индексами
+# (is_active, поле, id), поэтому первая и любая следующая страница читают
+# лишь PAGE_SIZE + 1 строк индекса. Страницы кэшируются по нормализованному
+# ключу фильтров: ?max_price=100&status=in_stock и ?status=in_stock&max_price=100.00
+# попадают в одну запись. Версия 'catalog' поднимается при изменении товаров
+# и тегов (signals.py), 'catalog_popular' — при записи просмотров,
+# 'catalog_rating' — при добавлении и удалении отзывов.
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 5)
+
+
+def filter_products(queryset, filters, tags=()):
+    if 'min_price' in filters:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if 'status' in filters:
+        queryset = queryset.filter(status=filters['status'])
+    if 'seller' in filters:
+        queryset = queryset.filter(seller_id=filters['seller'])
+    return filter_by_tags(queryset, tags)
+
+
+def filter_key(filters, tags=()):
+    """Строка, одинаковая для равных наборов фильтров независимо от записи в URL."""
+    parts = [
+        f'{name}={value.normalize() if hasattr(value, "normalize") else value}'
+        for name, value in sorted(filters.items())
+    ]
+    if tags:
+        parts.append('tags=' + ','.join(sorted(tags)))
+    return '&'.join(parts)
+
+
+def catalog_page(request, form, tags, param='cursor', per_page=PAGE_SIZE):
+    """
+    Страница активных товаров для product_list: из кэша или через
+    paginate_keyset; next_url/previous_url строятся по текущему запросу.
+    """
+    sort, order_field, descending = form.ordering
+    filters = form.filters
+    cursor = request.GET.get(param) or ''
+    versions = [get_version('catalog')]
+    if sort in ('popular', 'rating'):
+        versions.append(get_version(f'catalog_{sort}'))
+    raw_key = f'{filter_key(filters, tags)}|{sort}|{cursor}|{per_page}'
+    key = f"catalog:{'.'.join(map(str, versions))}:{hashlib.md5(raw_key.encode()).hexdigest()}"
+    page = cache.get(key)
+    if page is None:
+        queryset = filter_products(Product.objects.filter(is_active=True), filters, tags)
+        page = paginate_keyset(queryset, order_field, cursor, per_page, descending)
+        cache.set(key, page, CATALOG_CACHE_TIMEOUT)
+    return set_page_urls(request, page, param)
+
+
+def catalog_facets(form, tags):
+    """Счётчики тегов для той же выборки, что и catalog_page (без сортировки)."""
+    filters = form.filters
+    products = filter_products(Product.objects.filter(is_active=True), filters, tags)
+    return get_tag_facets(products, filter_key(filters, tags), tags)
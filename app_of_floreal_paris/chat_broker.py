@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Брокер доставки новых сообщений чата подписчикам SSE-потока (views.chat_stream).
+# По умолчанию — в памяти процесса: годится, когда сайт обслуживает один
+# ASGI-процесс. Для нескольких процессов в CHAT_BROKER_BACKEND указывается
+# класс с теми же методами publish/subscribe поверх внешней шины.
+BROKER_BACKEND = getattr(
+    settings, 'CHAT_BROKER_BACKEND',
+    'app_of_floreal_paris.chat_broker.InProcessBroker',
+)
+# Ограничение очереди одного подписчика: медленный клиент не копит память
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, room_id, payload):
+        """
+        Рассылает payload подписчикам комнаты. Можно звать из любого потока.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(room_id, ()))
+        for subscriber in subscribers:
+            loop, queue = subscriber
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, payload)
+            except RuntimeError:
+                # цикл подписчика уже закрыт, а __aexit__ не успел отписать
+                # его — сообщение сохранено, отправитель не должен получить 500
+                self._remove(room_id, subscriber)
+
+    @staticmethod
+    def _deliver(queue, payload):
+        if not queue.full():
+            queue.put_nowait(payload)
+
+    def subscribe(self, room_id):
+        return _Subscription(self, room_id)
+
+    def _add(self, room_id, subscriber):
+        with self._lock:
+            self._subscribers[room_id].add(subscriber)
+
+    def _remove(self, room_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(room_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[room_id]
+
+
+class _Subscription:
+    """
+    async with broker.subscribe(room_id) as sub:
+        payload = await sub.get(timeout)
+    """
+
+    def __init__(self, broker, room_id):
+        self.broker = broker
+        self.room_id = room_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._key = None
+
+    async def __aenter__(self):
+        self._key = (asyncio.get_running_loop(), self.queue)
+        self.broker._add(self.room_id, self._key)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker._remove(self.room_id, self._key)
+
+    async def get(self, timeout=None):
+        """Следующий payload или None по таймауту."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(BROKER_BACKEND)()
+    return _broker
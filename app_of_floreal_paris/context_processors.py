@@ -1,17 +1,10 @@
-from .models import Cart
+from .cart_cache import get_cart_summary
 
 def cart_summary(request):
     if request.user.is_authenticated:
-        # берём или создаём активную корзину
-        cart = Cart.objects.filter(user=request.user, is_active=True).first()
-        if not cart:
-            cart = Cart.objects.create(user=request.user)
-        count = cart.total_items()
-        total = cart.total_price()
-    else:
-        count = 0
-        total = 0
+        # сводка из кэша; корзину на просмотре страниц не создаём
+        return get_cart_summary(request.user.pk)
     return {
-        'cart_count': count,
-        'cart_total': total
+        'cart_count': 0,
+        'cart_total': 0
     }
@@ -0,0 +1,86 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef
+from taggit.models import TaggedItem
+
+from .models import Product
+from .page_cache import get_version
+
+# Фильтр каталога по тегам (?tag=roses&tag=wedding — товар должен иметь все)
+# и счётчики по тегам для текущей выборки. Счётчики считаются одним
+# GROUP BY по TaggedItem и кэшируются; ключ включает версию 'catalog',
+# которую сигналы поднимают при изменении товаров и их тегов.
+TAG_PARAM = 'tag'
+FACET_LIMIT = getattr(settings, 'CATALOG_FACET_LIMIT', 20)
+FACET_CACHE_TIMEOUT = getattr(settings, 'CATALOG_FACET_CACHE_TIMEOUT', 60 * 10)
+MAX_SELECTED_TAGS = 5
+
+
+def selected_tags(request):
+    """Выбранные слаги тегов из GET без повторов, в исходном порядке."""
+    slugs = [slug.strip() for slug in request.GET.getlist(TAG_PARAM) if slug.strip()]
+    return list(dict.fromkeys(slugs))[:MAX_SELECTED_TAGS]
+
+
+def _tagged(slug):
+    return TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Product),
+        object_id=OuterRef('pk'),
+        tag__slug=slug,
+    )
+
+
+def filter_by_tags(queryset, slugs):
+    # EXISTS на каждый тег: без JOIN по m2m и без дублей строк товара
+    for slug in slugs:
+        queryset = queryset.filter(Exists(_tagged(slug)))
+    return queryset
+
+
+def compute_tag_facets(products, limit=FACET_LIMIT):
+    rows = (
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Product),
+            object_id__in=products.values('pk'),
+        )
+        .values('tag__name', 'tag__slug')
+        .annotate(count=Count('object_id'))
+        .order_by('-count', 'tag__name')[:limit]
+    )
+    return [
+        {'name': row['tag__name'], 'slug': row['tag__slug'], 'count': row['count']}
+        for row in rows
+    ]
+
+
+def get_tag_facets(products, filter_key, slugs=()):
+    """
+    [{'name', 'slug', 'count'}, ...] — сколько товаров из products (уже
+    отфильтрованных) несут каждый тег. filter_key однозначно описывает
+    фильтры products и входит в ключ кэша (см. catalog.filter_key).
+    """
+    key = f"facets:{get_version('catalog')}:{hashlib.md5(filter_key.encode()).hexdigest()}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_tag_facets(products, FACET_LIMIT + len(slugs))
+        cache.set(key, facets, FACET_CACHE_TIMEOUT)
+    return facets
+
+
+def facet_links(request, facets, slugs):
+    """
+    Добавляет к фасетам selected и url — ссылку, которая включает или
+    выключает тег, сохраняя остальные параметры (курсор сбрасывается).
+    """
+    links = []
+    for facet in facets:
+        selected = facet['slug'] in slugs
+        new_slugs = [s for s in slugs if s != facet['slug']] if selected else slugs + [facet['slug']]
+        query = request.GET.copy()
+        query.pop('cursor', None)
+        query.setlist(TAG_PARAM, new_slugs)
+        links.append({**facet, 'selected': selected, 'url': f'?{query.urlencode()}'})
+    return links
@@ -129,4 +129,61 @@ class ReviewForm(forms.ModelForm):
 class FakePaymentForm(forms.Form):
     card_number = forms.CharField(label="Номер карты", max_length=19)
     expiry = forms.CharField(label="Срок действия (MM/YY)", max_length=5)
-    cvv = forms.CharField(label="CVV", max_length=3)
\ No newline at end of file
+    cvv = forms.CharField(label="CVV", max_length=3)
+
+class CatalogFilterForm(forms.Form):
+    # sort -> (поле, по убыванию) для курсорной пагинации (pagination.paginate_keyset)
+    SORT_ORDERS = {
+        'new': ('created_at', True),
+        'popular': ('views', True),
+        'rating': ('rating_avg', True),
+        'price': ('price', False),
+        'price_desc': ('price', True),
+    }
+    SORT_CHOICES = (
+        ('new', 'Новые'),
+        ('popular', 'Популярные'),
+        ('rating', 'По рейтингу'),
+        ('price', 'Дешевле'),
+        ('price_desc', 'Дороже'),
+    )
+
+    min_price = forms.DecimalField(
+        label="Цена от", required=False, min_value=0, max_digits=10, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'placeholder': 'от'}),
+    )
+    max_price = forms.DecimalField(
+        label="до", required=False, min_value=0, max_digits=10, decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'placeholder': 'до'}),
+    )
+    status = forms.ChoiceField(
+        label="Статус", required=False, choices=(('', 'Любой'),) + Product.STATUS_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    seller = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    sort = forms.ChoiceField(
+        label="Сортировка", required=False, choices=SORT_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        low, high = cleaned_data.get('min_price'), cleaned_data.get('max_price')
+        if low is not None and high is not None and low > high:
+            self.add_error('max_price', "Верхняя граница меньше нижней")
+        return cleaned_data
+
+    @property
+    def filters(self):
+        """Проверенные фильтры без пустых значений; невалидные поля отбрасываются."""
+        data = getattr(self, 'cleaned_data', {})
+        return {
+            name: data[name]
+            for name in ('min_price', 'max_price', 'status', 'seller')
+            if name in data and data[name] not in (None, '')
+        }
+
+    @property
+    def ordering(self):
+        sort = getattr(self, 'cleaned_data', {}).get('sort') or 'new'
+        return sort, *self.SORT_ORDERS[sort]
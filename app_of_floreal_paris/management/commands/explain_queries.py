@@ -0,0 +1,72 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from app_of_floreal_paris.models import Cart, ChatRoom, Message, Order, Product, Review
+
+PAGE = 25
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN ANALYZE для горячих запросов витрины: тип плана, использованный "
+        "индекс и время. Удобно сравнивать до и после миграции на больших данных "
+        "(см. seed_marketplace)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', action='store_true', help="Печатать планы целиком")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Нужен PostgreSQL")
+        for name, queryset in self.queries():
+            plan = queryset.explain(analyze=True, buffers=True)
+            top = next((line.strip() for line in plan.splitlines() if '->' in line or 'Scan' in line), plan)
+            scans = sorted(set(re.findall(r'((?:Index Only |Bitmap Index |Bitmap Heap |Index |Seq )Scan[^(]*)', plan)))
+            total = re.search(r'Execution Time: ([\d.]+) ms', plan)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {total.group(1) if total else '?'} мс"
+            ))
+            if options['plans']:
+                self.stdout.write(plan)
+            else:
+                for scan in scans or [top]:
+                    self.stdout.write(f"    {scan.strip()}")
+
+    def queries(self):
+        # самые «тяжёлые» объекты: у кого больше всего строк
+        seller_id = (Product.objects.values('seller').annotate(n=Count('id'))
+                     .order_by('-n').values_list('seller', flat=True).first())
+        product_id = (Review.objects.values('product').annotate(n=Count('id'))
+                      .order_by('-n').values_list('product', flat=True).first())
+        buyer_id = (Order.objects.values('user').annotate(n=Count('id'))
+                    .order_by('-n').values_list('user', flat=True).first())
+        room_id = (Message.objects.values('chat_room').annotate(n=Count('id'))
+                   .order_by('-n').values_list('chat_room', flat=True).first())
+        chat_user_id = ChatRoom.objects.filter(pk=room_id).values_list('buyer', flat=True).first()
+
+        active = Product.objects.filter(is_active=True)
+        return [
+            ('Каталог: новинки', active.order_by('-created_at', '-id')[:PAGE]),
+            ('Каталог: популярные', active.order_by('-views', '-id')[:PAGE]),
+            ('Каталог: по рейтингу', active.order_by('-rating_avg', '-id')[:PAGE]),
+            ('Каталог: дешевле', active.order_by('price', 'id')[:PAGE]),
+            ('Каталог: дороже', active.order_by('-price', '-id')[:PAGE]),
+            ('Каталог: цена 50–100, в наличии, новинки',
+                active.filter(price__gte=50, price__lte=100, status='in_stock')
+                .order_by('-created_at', '-id')[:PAGE]),
+            ('Каталог: цена от 150, дешевле', active.filter(price__gte=150).order_by('price', 'id')[:PAGE]),
+            ('Главная: популярные', active.order_by('-views')[:4]),
+            ('Товары продавца', Product.objects.filter(seller=seller_id).order_by('-created_at', '-id')[:PAGE]),
+            ('Отзывы товара', Review.objects.filter(product=product_id).order_by('-created_at', '-id')[:11]),
+            ('Заказы покупателя', Order.objects.filter(user=buyer_id).order_by('-created_at', '-id')[:PAGE]),
+            ('Активная корзина', Cart.objects.filter(user=buyer_id, is_active=True)[:1]),
+            ('Список чатов', ChatRoom.objects.filter(Q(buyer=chat_user_id) | Q(seller=chat_user_id))
+                .order_by('-updated_at')),
+            ('История чата', Message.objects.filter(chat_room=room_id).order_by('-id')[:51]),
+            ('Непрочитанные', Message.objects.filter(chat_room=room_id, read=False)
+                .exclude(sender=chat_user_id)),
+        ]
@@ -0,0 +1,66 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_of_floreal_paris.models import Product
+
+FIELDS = ['id', 'seller', 'title', 'description', 'price', 'status', 'image', 'tags', 'is_active']
+
+
+class Command(BaseCommand):
+    help = "Экспорт товаров в CSV/JSONL (формат совместим с import_products)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='jsonl')
+        parser.add_argument('--output', help="Файл; по умолчанию stdout")
+        parser.add_argument('--seller', help="Только товары этого продавца")
+        parser.add_argument('--active-only', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        products = Product.objects.select_related('seller').only(
+            'id', 'seller__username', 'title', 'description', 'price',
+            'status', 'image', 'is_active',
+        ).prefetch_related('tags').order_by('id')
+        if options['seller']:
+            products = products.filter(seller__username=options['seller'])
+        if options['active_only']:
+            products = products.filter(is_active=True)
+
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        started = time.monotonic()
+        count = 0
+        try:
+            writer = csv.DictWriter(out, FIELDS) if options['format'] == 'csv' else None
+            if writer:
+                writer.writeheader()
+            # iterator(chunk_size) читает порциями и подгружает теги для каждой порции
+            for product in products.iterator(chunk_size=options['chunk_size']):
+                row = {
+                    'id': product.id,
+                    'seller': product.seller.username,
+                    'title': product.title,
+                    'description': product.description,
+                    'price': str(product.price),
+                    'status': product.status,
+                    'image': product.image.name,
+                    'tags': [tag.name for tag in product.tags.all()],
+                    'is_active': product.is_active,
+                }
+                if writer:
+                    row['tags'] = ', '.join(row['tags'])
+                    writer.writerow(row)
+                else:
+                    out.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f"Экспортировано: {count}, {elapsed:.1f} с ({count / elapsed if elapsed else count:.0f} тов./с)"
+        ))
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from app_of_floreal_paris.models import Product
+
+
+class Command(BaseCommand):
+    help = "Создаёт недостающие уменьшенные копии изображений товаров (image_320/640/960)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Число параллельных потоков (Pillow отпускает GIL)")
+        parser.add_argument('--force', action='store_true',
+                            help="Пересоздать копии, даже если они уже есть")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.force = options['force']
+        self.created = self.failed = 0
+        chunk_size = options['chunk_size']
+        total = 0
+
+        products = Product.objects.exclude(image='').only('id', 'image').iterator(
+            chunk_size=chunk_size
+        )
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            batch = []
+            for product in products:
+                batch.append(product)
+                # обрабатываем пачками, чтобы не держать в памяти весь каталог
+                if len(batch) == chunk_size:
+                    self.run_batch(pool, batch)
+                    total += len(batch)
+                    batch = []
+            self.run_batch(pool, batch)
+            total += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Товаров: {total}, создано копий: {self.created}, ошибок: {self.failed}"
+        ))
+
+    def run_batch(self, pool, batch):
+        for created, error in pool.map(self.render, batch):
+            self.created += created
+            if error:
+                self.failed += 1
+                self.stderr.write(error)
+
+    def render(self, product):
+        created = 0
+        try:
+            for name in Product.RENDITIONS:
+                rendition = getattr(product, name)
+                if self.force or not rendition.storage.exists(rendition.name):
+                    rendition.generate(force=True)
+                    created += 1
+        except Exception as exc:
+            return created, f"Товар #{product.pk}: {exc}"
+        return created, None
@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app_of_floreal_paris.bulk import bulk_tag_products, parse_tags
+from app_of_floreal_paris.models import Product, User
+from app_of_floreal_paris.page_cache import bump_version
+from app_of_floreal_paris.search import refresh_search_vectors
+
+STATUSES = dict(Product.STATUS_CHOICES)
+PRICE_FIELD = Product._meta.get_field('price')
+
+
+def read_records(path, fmt):
+    """
+    Построчно читает CSV или JSONL, не загружая файл целиком. Вместо битой
+    строки JSONL отдаёт ValueError — она пропускается, как и другие
+    некорректные записи, и не сбивает счёт записей для --resume.
+    """
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield ValueError(f"некорректный JSON: {exc.msg}")
+                    continue
+                yield record if isinstance(record, dict) else ValueError("запись не является объектом")
+
+
+class Command(BaseCommand):
+    help = (
+        "Импорт товаров из CSV/JSONL. Поля: seller (username), title, description, "
+        "price, status, image (путь в MEDIA_ROOT), tags, is_active"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="По умолчанию — по расширению файла")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--resume', action='store_true',
+                            help="Продолжить с места последней сохранённой пачки")
+
+    def handle(self, path, **options):
+        if not os.path.exists(path):
+            raise CommandError(f"Файл {path} не найден")
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        batch_size = options['batch_size']
+        checkpoint = f'{path}.checkpoint'
+
+        done = 0
+        if options['resume'] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                done = int(f.read().strip() or 0)
+            self.stdout.write(f"Продолжаем после записи {done}")
+
+        records = islice(read_records(path, fmt), done, None)
+        imported = skipped = 0
+        started = time.monotonic()
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            created, errors = self.import_batch(batch, first_number=done + 1)
+            for error in errors:
+                self.stderr.write(error)
+            imported += created
+            skipped += len(errors)
+            done += len(batch)
+            # пачка закоммичена — запоминаем позицию для --resume
+            with open(checkpoint, 'w') as f:
+                f.write(str(done))
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {done} записей, {imported / (time.monotonic() - started):.0f} тов./с")
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if imported:
+            bump_version('home_popular', 'home_new', 'catalog')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Импортировано: {imported}, пропущено: {skipped}, "
+            f"{elapsed:.1f} с ({imported / elapsed if elapsed else imported:.0f} тов./с)"
+        ))
+        if imported:
+            self.stdout.write("Уменьшенные копии изображений: manage.py generate_product_renditions")
+
+    def import_batch(self, batch, first_number):
+        sellers = dict(User.objects.filter(
+            username__in={r.get('seller') for r in batch if isinstance(r, dict)}
+        ).values_list('username', 'id'))
+
+        products, tags, errors = [], [], []
+        for number, record in enumerate(batch, first_number):
+            try:
+                if isinstance(record, ValueError):
+                    raise record
+                products.append(self.build_product(record, sellers))
+                tags.append(parse_tags(record.get('tags')))
+            except ValueError as exc:
+                errors.append(f"Запись {number}: {exc}")
+
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            bulk_tag_products(list(zip(products, tags)))
+            refresh_search_vectors(Product.objects.filter(pk__in=[p.pk for p in products]))
+        return len(products), errors
+
+    def build_product(self, record, sellers):
+        seller_id = sellers.get(record.get('seller'))
+        if seller_id is None:
+            raise ValueError(f"неизвестный продавец {record.get('seller')!r}")
+        title = (record.get('title') or '').strip()
+        if not title:
+            raise ValueError("пустое название")
+        try:
+            price = Decimal(str(record.get('price')))
+        except InvalidOperation:
+            raise ValueError(f"некорректная цена {record.get('price')!r}")
+        # NaN, бесконечность, отрицательная цена и лишние разряды уронили бы
+        # bulk_create всей пачки (DataError) — отсекаем их здесь
+        if not price.is_finite() or price < 0:
+            raise ValueError(f"некорректная цена {record.get('price')!r}")
+        try:
+            PRICE_FIELD.run_validators(price)
+        except ValidationError as exc:
+            raise ValueError(f"некорректная цена {record.get('price')!r}: {' '.join(exc.messages)}")
+        status = record.get('status') or 'in_stock'
+        if status not in STATUSES:
+            raise ValueError(f"неизвестный статус {status!r}")
+        is_active = record.get('is_active', True)
+        if isinstance(is_active, str):
+            is_active = is_active.strip().lower() not in ('0', 'false', 'no', '')
+        return Product(
+            seller_id=seller_id,
+            title=title[:200],
+            description=record.get('description') or '',
+            price=price,
+            status=status,
+            image=record.get('image') or '',
+            is_active=bool(is_active),
+        )
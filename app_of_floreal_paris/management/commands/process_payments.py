@@ -0,0 +1,56 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_of_floreal_paris.models import PaymentJob
+from app_of_floreal_paris.payments import get_gateway, process_next
+
+logger = logging.getLogger('floreal.payments')
+
+
+class Command(BaseCommand):
+    help = (
+        "Обработчик очереди оплат: забирает задания PaymentJob и проводит их через "
+        "платёжный шлюз. Можно запускать в несколько процессов — задания не пересекаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Обработать готовые задания и выйти")
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help="Пауза между опросами пустой очереди, с")
+
+    def handle(self, *args, **options):
+        gateway = get_gateway()
+        processed = 0
+        try:
+            while True:
+                # долгоживущий процесс: закрываем соединения, пережившие CONN_MAX_AGE
+                close_old_connections()
+                try:
+                    job = process_next(gateway)
+                except Exception:
+                    # например, БД недоступна: задание (если взято) вернётся
+                    # в очередь по истечении аренды, а обработчик продолжит
+                    logger.exception("Сбой обработчика очереди оплат")
+                    time.sleep(options['sleep'])
+                    continue
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                processed += 1
+                job.refresh_from_db(fields=['status', 'last_error'])
+                self.stdout.write(
+                    f"Заказ #{job.order_id}: попытка {job.attempts}, {job.get_status_display()}"
+                    + (f" ({job.last_error})" if job.last_error else "")
+                )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано заданий: {processed}, в очереди: "
+            f"{PaymentJob.objects.filter(status__in=('queued', 'running')).count()}"
+        ))
@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from app_of_floreal_paris.models import Order
+from app_of_floreal_paris.receipts import ensure_receipt
+
+
+def _init_worker():
+    # при spawn дочерний процесс стартует «с нуля»; при fork setup() ничего не делает
+    django.setup()
+
+
+def _render(order_ids, force):
+    """Рендерит чеки пачки заказов в отдельном процессе."""
+    created, errors = 0, []
+    for order in Order.objects.filter(pk__in=order_ids).select_related('user'):
+        try:
+            created += ensure_receipt(order, force=force)[1]
+        except Exception as exc:
+            errors.append(f"Заказ #{order.pk}: {exc}")
+    return created, errors
+
+
+class Command(BaseCommand):
+    help = "Заранее создаёт PDF-чеки завершённых заказов (пул процессов)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Число процессов; по умолчанию — по числу ядер")
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true',
+                            help="Пересоздать уже существующие чеки")
+        parser.add_argument('--status', default='completed')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(
+            Order.objects.filter(status=options['status']).order_by('id').values_list('id', flat=True)
+        )
+        batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        # рендер PDF упирается в CPU, поэтому процессы, а не потоки;
+        # соединение с БД родителя нельзя делить с дочерними процессами
+        connections.close_all()
+
+        created, failed = 0, 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            futures = [pool.submit(_render, batch, options['force']) for batch in batches]
+            for future in futures:
+                batch_created, errors = future.result()
+                created += batch_created
+                failed += len(errors)
+                for error in errors:
+                    self.stderr.write(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Заказов: {len(ids)}, создано чеков: {created}, ошибок: {failed}"
+        ))
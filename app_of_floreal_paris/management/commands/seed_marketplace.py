@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_of_floreal_paris.models import User
+from app_of_floreal_paris.page_cache import bump_version
+from app_of_floreal_paris.seed import PASSWORD, seed_marketplace
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет БД синтетическим маркетплейсом для нагрузочного тестирования. "
+        "Одинаковый --seed даёт одинаковые данные."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sellers', type=int, default=100)
+        parser.add_argument('--buyers', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--carts', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--chats', type=int, default=1000)
+        parser.add_argument('--messages-per-chat', type=int, default=20)
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help="Множитель для всех количеств, например 100 для ~миллиона товаров")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help="Префикс имён пользователей; должен быть новым для каждого прогона")
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--no-copy', action='store_true',
+                            help="Не использовать COPY даже на PostgreSQL")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Пользователи с префиксом {prefix!r} уже есть — укажите другой --prefix")
+
+        scale = options['scale']
+        counts = {
+            name: int(options[name] * scale)
+            for name in ('sellers', 'buyers', 'products', 'reviews', 'carts', 'orders', 'chats')
+        }
+        started = time.monotonic()
+
+        def log(message):
+            self.stdout.write(f"[{time.monotonic() - started:7.1f} с] {message}")
+
+        seed_marketplace(
+            **counts,
+            messages_per_chat=options['messages_per_chat'],
+            prefix=prefix,
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            use_copy=False if options['no_copy'] else None,
+            log=log,
+        )
+        bump_version('home_popular', 'home_new', 'catalog')
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.monotonic() - started:.1f} с. Пароль пользователей: {PASSWORD}"
+        ))
+        self.stdout.write("Уменьшенные копии изображений: manage.py generate_product_renditions")
+        self.stdout.write("Сводки продаж для аналитики: manage.py rebuild_sales_rollups")
@@ -0,0 +1,182 @@
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+# Инструментация запросов: число SQL-запросов, время в БД и повторы одного
+# и того же SQL-шаблона (признак N+1) на каждый HTTP-запрос. Итог уходит
+# в заголовок Server-Timing (видно во вкладке Network браузера) и в лог
+# floreal.requests: уровнем DEBUG на каждый запрос, INFO — если запросов
+# к БД не меньше MANY_QUERIES. Запросы дольше порога — подробным отчётом
+# в floreal.slow_requests и, если задан SLOW_REQUEST_LOG, в JSONL-файл.
+SERVER_TIMING = getattr(settings, 'SERVER_TIMING_ENABLED', settings.DEBUG)
+SLOW_REQUEST_MS = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+MANY_QUERIES = getattr(settings, 'MANY_QUERIES_THRESHOLD', 30)
+SLOW_REQUEST_LOG = getattr(settings, 'SLOW_REQUEST_LOG', None)
+SLOW_REPORT_QUERIES = 10
+
+logger = logging.getLogger('floreal.requests')
+slow_logger = logging.getLogger('floreal.slow_requests')
+_report_lock = threading.Lock()
+
+
+class QueryStats:
+    """Обёртка для connection.execute_wrapper: считает запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.timings = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.statements[sql] += 1
+            self.timings[sql] += elapsed
+
+    @property
+    def repeated(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+# Статистика текущего асинхронного запроса. sync_to_async копирует контекст
+# в свой поток, поэтому запросы ORM из синхронных view и middleware
+# попадают в статистику того запроса, который их вызвал.
+_request_stats = ContextVar('request_stats', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _install(connection):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+@receiver(connection_created)
+def count_queries_on_new_connection(sender, connection, **kwargs):
+    _install(connection)
+
+
+class RequestTimingMiddleware:
+    """
+    Ставится первой в MIDDLEWARE, чтобы учесть всю цепочку обработки.
+    Время стриминговых ответов учитывается до отдачи первого байта.
+
+    Работает и в синхронной, и в асинхронной цепочке, чтобы под ASGI не
+    переводить весь стек (и SSE-поток чата) в синхронный режим. В асинхронном
+    режиме ORM работает в потоках sync_to_async со своими соединениями:
+    запросы считает обёртка _count_query, которая ставится на каждое новое
+    соединение и находит статистику запроса через _request_stats.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        return self.record(request, response, started, stats)
+
+    async def __acall__(self, request):
+        # соединения, открытые до загрузки модуля, сигнал connection_created пропустил
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        return self.record(request, response, started, stats)
+
+    def record(self, request, response, started, stats):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = stats.duration * 1000
+
+        match = request.resolver_match
+        view_name = match.view_name if match else '-'
+        if SERVER_TIMING:
+            timing = (
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries, {stats.repeated} repeated", '
+                f'app;dur={total_ms - db_ms:.1f}, total;dur={total_ms:.1f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        logger.log(
+            logging.INFO if stats.count >= MANY_QUERIES else logging.DEBUG,
+            '%s %s view=%s status=%s total_ms=%.1f db_ms=%.1f queries=%d repeated=%d',
+            request.method, request.path, view_name, response.status_code,
+            total_ms, db_ms, stats.count, stats.repeated,
+            extra={
+                'view_name': view_name,
+                'status_code': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': stats.count,
+                'repeated': stats.repeated,
+            },
+        )
+        if total_ms >= SLOW_REQUEST_MS:
+            self.report_slow(request, response, view_name, total_ms, db_ms, stats)
+        return response
+
+    def report_slow(self, request, response, view_name, total_ms, db_ms, stats):
+        report = {
+            'time': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view_name,
+            'status': response.status_code,
+            'user_id': getattr(getattr(request, 'user', None), 'pk', None),
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'queries': stats.count,
+            'repeated': stats.repeated,
+            'slowest': [
+                {'sql': sql, 'ms': round(seconds * 1000, 2), 'count': stats.statements[sql]}
+                for sql, seconds in stats.timings.most_common(SLOW_REPORT_QUERIES)
+            ],
+            'repeated_sql': [
+                {'sql': sql, 'count': count}
+                for sql, count in stats.statements.most_common(SLOW_REPORT_QUERIES)
+                if count > 1
+            ],
+        }
+        line = json.dumps(report, ensure_ascii=False)
+        slow_logger.warning(line)
+        if SLOW_REQUEST_LOG:
+            with _report_lock, open(SLOW_REQUEST_LOG, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2025-07-14 12:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Заполняем search_vector для уже существующих товаров тем же выражением,
+# что и search.build_search_vector: title/description (russian) + теги (simple).
+BACKFILL_SEARCH_VECTOR = """
+    UPDATE app_of_floreal_paris_product p
+       SET search_vector =
+           setweight(to_tsvector('russian'::regconfig, COALESCE(p.title, '')), 'A')
+        || setweight(to_tsvector('russian'::regconfig, COALESCE(p.description, '')), 'B')
+        || setweight(to_tsvector('simple'::regconfig, COALESCE((
+               SELECT string_agg(t.name, ' ')
+                 FROM taggit_taggeditem ti
+                 JOIN taggit_tag t ON t.id = ti.tag_id
+                 JOIN django_content_type ct ON ct.id = ti.content_type_id
+                WHERE ct.app_label = 'app_of_floreal_paris'
+                  AND ct.model = 'product'
+                  AND ti.object_id = p.id
+           ), '')), 'A')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_of_floreal_paris', '0002_review'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='product_title_trgm_gin', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+    ]
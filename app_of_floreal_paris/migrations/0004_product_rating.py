@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2025-07-16 09:42
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('app_of_floreal_paris', 'Product')
+    Review = apps.get_model('app_of_floreal_paris', 'Review')
+    per_product = Review.objects.filter(product=OuterRef('pk')).values('product')
+    count = Coalesce(Subquery(per_product.annotate(n=Count('id')).values('n')), Value(0))
+    total = Coalesce(Subquery(per_product.annotate(s=Sum('rating')).values('s')), Value(0))
+    Product.objects.update(rating_count=count, rating_sum=Cast(total, IntegerField()))
+    Product.objects.filter(rating_count__gt=0).update(
+        rating_avg=Cast(models.F('rating_sum'), models.DecimalField(max_digits=6, decimal_places=2))
+        / models.F('rating_count')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_of_floreal_paris', '0003_product_search_vector'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Отзывов'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-rating_avg', '-id'], name='product_active_rating_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2025-07-16 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_order_items(apps, schema_editor):
+    # для старых заказов строк нет — восстанавливаем их по корзине
+    # (цена берётся текущая, точнее уже не узнать)
+    Order = apps.get_model('app_of_floreal_paris', 'Order')
+    CartItem = apps.get_model('app_of_floreal_paris', 'CartItem')
+    OrderItem = apps.get_model('app_of_floreal_paris', 'OrderItem')
+    cart_orders = dict(Order.objects.filter(cart__isnull=False).values_list('cart_id', 'id'))
+    items = CartItem.objects.filter(cart_id__in=cart_orders).select_related('product').iterator(chunk_size=2000)
+    batch = []
+    for item in items:
+        batch.append(OrderItem(
+            order_id=cart_orders[item.cart_id],
+            product_id=item.product_id,
+            title=item.product.title,
+            price=item.product.price,
+            quantity=item.quantity,
+        ))
+        if len(batch) >= 2000:
+            OrderItem.objects.bulk_create(batch)
+            batch = []
+    OrderItem.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_of_floreal_paris', '0004_product_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='app_of_floreal_paris.order')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app_of_floreal_paris.product')),
+            ],
+        ),
+        migrations.RunPython(backfill_order_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.3 on 2025-07-16 12:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def deactivate_duplicate_carts(apps, schema_editor):
+    # до уникального индекса гонка в get_active_cart могла оставить
+    # пользователю несколько активных корзин; оставляем первую — ту же,
+    # что возвращал get_active_cart
+    Cart = apps.get_model('app_of_floreal_paris', 'Cart')
+    keep = (
+        Cart.objects.filter(is_active=True).values('user')
+        .annotate(first_id=Min('id')).values_list('first_id', flat=True)
+    )
+    Cart.objects.filter(is_active=True).exclude(id__in=list(keep)).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+    # индексы на больших таблицах строятся CREATE INDEX CONCURRENTLY, без
+    # блокировки записи на время построения; такое возможно только вне транзакции
+    atomic = False
+
+    dependencies = [
+        ('app_of_floreal_paris', '0005_order_item'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='chatroom',
+            index=models.Index(fields=['buyer', '-updated_at'], name='chatroom_buyer_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='chatroom',
+            index=models.Index(fields=['seller', '-updated_at'], name='chatroom_seller_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(fields=['chat_room', 'id'], name='message_room_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(condition=models.Q(('read', False)), fields=['chat_room'], name='message_room_unread_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-created_at', '-id'], name='product_active_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['is_active', '-views', '-id'], name='product_active_views_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['seller', '-created_at', '-id'], name='product_seller_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='review_product_created_idx'),
+        ),
+        migrations.RunPython(deactivate_duplicate_carts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='cart_one_active_per_user'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2025-07-18 10:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # индексы на больших таблицах строятся CREATE INDEX CONCURRENTLY, без
+    # блокировки записи на время построения; такое возможно только вне транзакции
+    atomic = False
+
+    dependencies = [
+        ('app_of_floreal_paris', '0006_storefront_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'price', 'id'], name='product_active_price_idx'),
+        ),
+    ]
@@ -5,13 +5,16 @@ import hmac
 from datetime import timedelta
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, Group, Permission
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Sum
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from imagekit.models import ProcessedImageField
-from imagekit.processors import ResizeToFill
+from imagekit.models import ImageSpecField, ProcessedImageField
+from imagekit.processors import ResizeToFill, ResizeToFit
 from taggit.managers import TaggableManager
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -99,7 +102,48 @@ class Product(models.Model):
         upload_to='products/',
         verbose_name="Изображение",
     )
+    # Уменьшенные копии для карточек (srcset). Создаются при первом обращении
+    # к url (стратегия JustInTime), так что копии есть и у товаров из
+    # import_products/seed_marketplace, где сигналы не срабатывают;
+    # manage.py generate_product_renditions создаёт их заранее. Наличие файла
+    # imagekit запоминает в кэше IMAGEKIT_CACHE_BACKEND (см. settings)
+    image_320 = ImageSpecField(source='image',
+                               processors=[ResizeToFit(320, upscale=False)],
+                               format='WEBP',
+                               options={'quality': 80})
+    image_640 = ImageSpecField(source='image',
+                               processors=[ResizeToFit(640, upscale=False)],
+                               format='WEBP',
+                               options={'quality': 80})
+    image_960 = ImageSpecField(source='image',
+                               processors=[ResizeToFit(960, upscale=False)],
+                               format='WEBP',
+                               options={'quality': 85})
     tags = TaggableManager()
+    # Поддерживается search.update_search_vector (title, description, теги)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Денормализованный рейтинг, обновляется сигналами Review (см. signals.py)
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Отзывов")
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0,
+                                     editable=False, verbose_name="Рейтинг")
+
+    class Meta:
+        indexes = [
+            # каталог и главная: фильтр is_active + порядок ключа пагинации (поле, id)
+            models.Index(fields=['is_active', '-created_at', '-id'], name='product_active_created_idx'),
+            models.Index(fields=['is_active', '-views', '-id'], name='product_active_views_idx'),
+            models.Index(fields=['is_active', '-rating_avg', '-id'], name='product_active_rating_idx'),
+            # сортировка по цене в обе стороны (обратный проход индекса) и диапазон цен
+            models.Index(fields=['is_active', 'price', 'id'], name='product_active_price_idx'),
+            # «мои товары» и публичный профиль
+            models.Index(fields=['seller', '-created_at', '-id'], name='product_seller_created_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            GinIndex(fields=['title'], name='product_title_trgm_gin',
+                     opclasses=['gin_trgm_ops']),
+        ]
+
+    RENDITIONS = ('image_320', 'image_640', 'image_960')
 
     @property
     def was_edited(self):
@@ -114,11 +158,29 @@ class Cart(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # одна активная корзина на пользователя; этот же индекс
+            # обслуживает поиск активной корзины по user
+            models.UniqueConstraint(fields=['user'], condition=models.Q(is_active=True),
+                                    name='cart_one_active_per_user'),
+        ]
+
+    def summary(self):
+        """
+        Количество товаров и сумма корзины одним агрегирующим запросом.
+        """
+        totals = self.items.aggregate(
+            count=Sum('quantity'),
+            total=Sum(F('quantity') * F('product__price')),
+        )
+        return totals['count'] or 0, totals['total'] or 0
+
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.summary()[0]
 
     def total_price(self):
-        return sum(item.product.price * item.quantity for item in self.items.all())
+        return self.summary()[1]
 
     def __str__(self):
         return f"Корзина пользователя {self.user.username} (Активна: {self.is_active})"
@@ -163,18 +225,82 @@ class Order(models.Model):
                               default='pending')
     digital_signature = models.CharField(max_length=64, blank=True)
 
-    def generate_signature(self):
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            # выгрузки и аналитика по периодам
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
+
+    def generate_signature(self, commit=True):
+        """
+        commit=False только вычисляет подпись — чтобы подписать заказ
+        до первого INSERT и не делать лишний save().
+        """
         message = f"{self.transaction_id}{self.total_amount}".encode()
         secret = settings.SECRET_KEY.encode()
         self.digital_signature = hmac.new(secret,
                                          message,
                                          hashlib.sha256).hexdigest()
-        self.save()
+        if commit:
+            self.save()
 
     def __str__(self):
         return f"Заказ #{self.id} - {self.get_status_display()}"
 
 
+class PaymentJob(models.Model):
+    """
+    Задание на оплату заказа для фонового обработчика (payments.py,
+    команда process_payments). Одно задание на заказ; ключ идемпотентности
+    для шлюза — transaction_id заказа.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнено'),
+        ('failed', 'Ошибка'),
+    )
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='payment_job')
+    idempotency_key = models.UUIDField(unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # queued — время следующей попытки, running — срок аренды обработчиком
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # выборка готовых к запуску заданий; завершённые в индекс не попадают
+            models.Index(fields=['run_at'], condition=models.Q(status__in=['queued', 'running']),
+                         name='paymentjob_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Оплата заказа #{self.order_id}: {self.status}"
+
+
+class OrderItem(models.Model):
+    """
+    Снимок строки корзины на момент оформления: название и цена
+    не меняются, даже если продавец потом отредактирует или удалит товар.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True)
+    title = models.CharField(max_length=200)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+
+    @property
+    def total(self):
+        return self.price * self.quantity
+
+    def __str__(self):
+        return f"{self.title} x {self.quantity}"
+
+
 class ChatRoom(models.Model):
     product = models.ForeignKey(Product,
                                 on_delete=models.CASCADE,
@@ -188,6 +314,12 @@ class ChatRoom(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['buyer', '-updated_at'], name='chatroom_buyer_updated_idx'),
+            models.Index(fields=['seller', '-updated_at'], name='chatroom_seller_updated_idx'),
+        ]
+
 
 class Message(models.Model):
     chat_room = models.ForeignKey(ChatRoom,
@@ -202,6 +334,15 @@ class Message(models.Model):
                                   blank=True,
                                   null=True)
 
+    class Meta:
+        indexes = [
+            # история и опрос чата идут по id внутри комнаты (id растёт вместе с timestamp)
+            models.Index(fields=['chat_room', 'id'], name='message_room_id_idx'),
+            # счётчики непрочитанных: непрочитанных мало, частичный индекс компактный
+            models.Index(fields=['chat_room'], condition=models.Q(read=False),
+                         name='message_room_unread_idx'),
+        ]
+
 
 class Report(models.Model):
     REPORT_TYPE_CHOICES = (
@@ -241,6 +382,20 @@ class Report(models.Model):
                                     related_name='resolved_reports')
     resolved_at = models.DateTimeField(null=True, blank=True)
     resolution_notes = models.TextField(blank=True)
+    # модератор, взявший жалобу в работу; захват истекает через
+    # DASHBOARD_REPORT_CLAIM_TTL, после чего жалоба снова в очереди
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL,
+                                   on_delete=models.SET_NULL,
+                                   null=True,
+                                   blank=True,
+                                   related_name='claimed_reports')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # очередь модерации: pending в порядке поступления
+            models.Index(fields=['status', 'created_at'], name='report_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Жалоба #{self.id} - {self.get_report_type_display()}"
@@ -284,6 +439,9 @@ class Review(models.Model):
 
     class Meta:
         unique_together = ('product', 'user')  # один отзыв от пользователя на товар
+        indexes = [
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_created_idx'),
+        ]
 
     def __str__(self):
         return f"Отзыв {self.rating}★ by {self.user.username} для {self.product.title}"
\ No newline at end of file
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cart, Order, OrderItem
+
+
+def place_order(user):
+    """
+    Оформляет заказ по активной корзине пользователя в одной транзакции.
+    Возвращает (order, created); order = None, если корзина пуста.
+
+    Строка активной корзины блокируется SELECT ... FOR UPDATE, поэтому
+    оформления одной корзины идут по очереди. Повторный запрос (двойной клик)
+    дожидается первого и активной корзины уже не находит: он получает заказ
+    по последней, только что оформленной корзине, если тот ещё ждёт оплаты.
+    На одну корзину приходится ровно один заказ.
+    """
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().filter(user=user, is_active=True).first()
+        if cart is None:
+            last_cart = Cart.objects.filter(user=user).order_by('-id').values('pk')[:1]
+            return Order.objects.filter(cart__in=last_cart, status='pending').first(), False
+
+        # строки и сумма одним запросом; цены фиксируются в OrderItem
+        lines = list(cart.items.order_by('id').values_list(
+            'product_id', 'product__title', 'product__price', 'quantity'
+        ))
+        if not lines:
+            return None, False
+
+        order = Order(
+            user=user,
+            cart=cart,
+            total_amount=sum(price * quantity for _, _, price, quantity in lines),
+            created_at=timezone.now(),
+        )
+        # подписываем до INSERT — заказ сохраняется один раз
+        order.generate_signature(commit=False)
+        order.save(force_insert=True)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, title=title, price=price, quantity=quantity)
+            for product_id, title, price, quantity in lines
+        ])
+
+        # деактивируем корзину, чтобы не создать по ней ещё раз
+        cart.is_active = False
+        cart.save(update_fields=['is_active'])
+    return order, True
@@ -0,0 +1,64 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+# Версии кэшируемых блоков. Ключ фрагмента/страницы включает версию, поэтому
+# для инвалидации достаточно «поднять» версию — старые записи просто истекут.
+HOME_CACHE_TIMEOUT = getattr(settings, 'HOME_CACHE_TIMEOUT', 60 * 10)
+VERSION_KEY = 'cache_version:{name}'
+
+
+def get_version(name):
+    key = VERSION_KEY.format(name=name)
+    version = cache.get(key)
+    if version is None:
+        # версия по времени: после вытеснения ключа старые записи не оживут
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(*names):
+    for name in names:
+        key = VERSION_KEY.format(name=name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def cache_page_for_anonymous(*version_names, timeout=HOME_CACHE_TIMEOUT):
+    """
+    Кэширует страницу целиком для анонимных посетителей. Ключ включает версии
+    version_names, так что страница обновляется вместе с нужными блоками.
+
+    CSRF-токен в общую копию попасть не должен: страница, при рендере которой
+    запрашивался токен ({% csrf_token %}), не кэшируется. Cookie с токеном
+    ставится каждому посетителю и на ответ из кэша — скрипты берут его оттуда.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method != 'GET' or request.user.is_authenticated
+                    or len(messages.get_messages(request))):
+                return view(request, *args, **kwargs)
+            versions = '.'.join(str(get_version(name)) for name in version_names)
+            key = f'page:{view.__name__}:{request.path}:{versions}'
+            content = cache.get(key)
+            if content is not None:
+                response = HttpResponse(content)
+            else:
+                response = view(request, *args, **kwargs)
+                uses_token = request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+                if response.status_code == 200 and not getattr(response, 'streaming', False) and not uses_token:
+                    cache.set(key, response.content, timeout)
+            get_token(request)
+            return response
+        return wrapper
+    return decorator
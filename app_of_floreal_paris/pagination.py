@@ -0,0 +1,161 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import DateTimeField, Q
+from django.utils.dateparse import parse_datetime
+
+# Курсорная (keyset) пагинация: вместо OFFSET страница продолжается с последней
+# пары (поле сортировки, id), поэтому стоимость не зависит от номера страницы,
+# а COUNT(*) не нужен вовсе. Сортировка по (field, id) в одном направлении:
+# по умолчанию по убыванию, для цены «дешевле» — по возрастанию.
+PAGE_SIZE = getattr(settings, 'CATALOG_PAGE_SIZE', 24)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.object_list = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = self.previous_url = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(field, value):
+    if isinstance(field, DateTimeField):
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is None:
+            raise InvalidCursor(value)
+        return parsed
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        raise InvalidCursor(value)
+
+
+def encode_cursor(value, pk, backwards=False):
+    raw = json.dumps([_dump_value(value), pk, int(backwards)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk, backwards = json.loads(base64.urlsafe_b64decode(padded))
+        return _load_value(field, value), int(pk), bool(backwards)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def paginate_keyset(queryset, order_field, cursor=None, per_page=PAGE_SIZE, descending=True):
+    """
+    Страница queryset, упорядоченного по (order_field DESC, id DESC),
+    а при descending=False — по (order_field ASC, id ASC).
+    Битый курсор молча сбрасывается на первую страницу.
+    """
+    field = queryset.model._meta.get_field(order_field)
+    position = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor, field)
+        except InvalidCursor:
+            position = None
+
+    # «вперёд» — в порядке сортировки страницы, «назад» — в обратном
+    sign = '-' if descending else ''
+    ahead, behind = ('lt', 'gt') if descending else ('gt', 'lt')
+    if position is None:
+        rows = list(queryset.order_by(f'{sign}{order_field}', f'{sign}pk')[:per_page + 1])
+        has_more, backwards = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        value, pk, backwards = position
+        if backwards:
+            after = (Q(**{f'{order_field}__{behind}': value})
+                     | Q(**{order_field: value, f'pk__{behind}': pk}))
+            reverse = '' if descending else '-'
+            rows = list(queryset.filter(after).order_by(f'{reverse}{order_field}', f'{reverse}pk')[:per_page + 1])
+            has_more = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+        else:
+            before = (Q(**{f'{order_field}__{ahead}': value})
+                      | Q(**{order_field: value, f'pk__{ahead}': pk}))
+            rows = list(queryset.filter(before).order_by(f'{sign}{order_field}', f'{sign}pk')[:per_page + 1])
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+
+    if not rows:
+        return KeysetPage(rows)
+
+    first, last = rows[0], rows[-1]
+    # идём вперёд: «дальше» есть, если нашлась лишняя строка, «назад» — если был курсор;
+    # идём назад: наоборот
+    has_next = has_more if not backwards else True
+    has_previous = position is not None if not backwards else has_more
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(getattr(last, order_field), last.pk) if has_next else None,
+        previous_cursor=(
+            encode_cursor(getattr(first, order_field), first.pk, backwards=True)
+            if has_previous else None
+        ),
+    )
+
+
+def _url_with(request, param, cursor):
+    query = request.GET.copy()
+    query[param] = cursor
+    return f'?{query.urlencode()}'
+
+
+def paginate_request(request, queryset, order_field, param='cursor', per_page=PAGE_SIZE,
+                     descending=True):
+    """
+    paginate_keyset с курсором из request.GET[param]; у страницы заполняются
+    next_url/previous_url с сохранением остальных GET-параметров.
+    """
+    page = paginate_keyset(queryset, order_field, request.GET.get(param), per_page, descending)
+    return set_page_urls(request, page, param)
+
+
+def set_page_urls(request, page, param='cursor'):
+    if page.has_next:
+        page.next_url = _url_with(request, param, page.next_cursor)
+    if page.has_previous:
+        page.previous_url = _url_with(request, param, page.previous_cursor)
+    return page
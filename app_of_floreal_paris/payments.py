@@ -0,0 +1,176 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Order, PaymentJob
+
+# Оплата идёт в фоне. payment_view переводит заказ в processing, ставит
+# задание PaymentJob и сразу отвечает; страница результата опрашивает статус.
+# Обработчик (команда process_payments, их можно запустить несколько) забирает
+# задания SELECT ... FOR UPDATE SKIP LOCKED и ходит в шлюз вне транзакции:
+# секунды ожидания шлюза не держат ни блокировок, ни соединения в транзакции.
+# Задание берётся в аренду на PAYMENT_JOB_TIMEOUT — если обработчик упал,
+# задание снова попадёт в выборку, а повторный запрос к шлюзу с тем же ключом
+# идемпотентности (transaction_id заказа) не спишет деньги второй раз.
+GATEWAY_BACKEND = getattr(
+    settings, 'PAYMENT_GATEWAY_BACKEND',
+    'app_of_floreal_paris.payments.FakeGateway',
+)
+JOB_TIMEOUT = getattr(settings, 'PAYMENT_JOB_TIMEOUT', timedelta(minutes=1))
+MAX_ATTEMPTS = getattr(settings, 'PAYMENT_MAX_ATTEMPTS', 5)
+# пауза перед повтором, с; удваивается с каждой попыткой
+RETRY_BASE = getattr(settings, 'PAYMENT_RETRY_BASE', 5)
+RETRY_MAX = getattr(settings, 'PAYMENT_RETRY_MAX', 300)
+FINAL_STATUSES = ('completed', 'cancelled')
+
+logger = logging.getLogger('floreal.payments')
+
+
+class GatewayError(Exception):
+    """Временная ошибка шлюза (таймаут, 5xx): попытку можно повторить."""
+
+
+class FakeGateway:
+    """
+    Локальная замена платёжного шлюза. Отвечает через latency секунд,
+    с вероятностью failure_rate падает с GatewayError, с вероятностью
+    decline_rate отклоняет платёж. Ответ запоминается в кэше по ключу
+    идемпотентности, повтор с тем же ключом получает тот же ответ
+    (при нескольких обработчиках кэш должен быть общим).
+    """
+    RESULT_TTL = 60 * 60 * 24
+
+    def __init__(self, latency=None, failure_rate=None, decline_rate=None):
+        self.latency = getattr(settings, 'FAKE_GATEWAY_LATENCY', 1.0) if latency is None else latency
+        self.failure_rate = (getattr(settings, 'FAKE_GATEWAY_FAILURE_RATE', 0.1)
+                             if failure_rate is None else failure_rate)
+        self.decline_rate = (getattr(settings, 'FAKE_GATEWAY_DECLINE_RATE', 0.2)
+                             if decline_rate is None else decline_rate)
+
+    def charge(self, idempotency_key, amount):
+        """True — платёж прошёл, False — отклонён."""
+        time.sleep(self.latency)
+        key = f'fake_gateway:{idempotency_key}'
+        approved = cache.get(key)
+        if approved is not None:
+            return approved
+        if random.random() < self.failure_rate:
+            raise GatewayError("шлюз не ответил")
+        approved = random.random() >= self.decline_rate
+        # из двух одновременных попыток с одним ключом побеждает первая
+        if not cache.add(key, approved, self.RESULT_TTL):
+            approved = cache.get(key, approved)
+        return approved
+
+
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        _gateway = import_string(GATEWAY_BACKEND)()
+    return _gateway
+
+
+def enqueue_payment(order):
+    """
+    Переводит заказ в processing и ставит задание на оплату. Строка заказа
+    блокируется, поэтому повторная отправка формы не создаст второго задания.
+    Возвращает задание или None, если заказ уже не ожидает оплаты.
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order.pk)
+        if order.status != 'pending':
+            return None
+        # save(), а не update(): на смену статуса подписаны сводки продаж
+        order.status = 'processing'
+        order.save(update_fields=['status'])
+        return PaymentJob.objects.create(order=order, idempotency_key=order.transaction_id)
+
+
+def claim_job():
+    """
+    Берёт в аренду самое раннее готовое задание; None — очередь пуста.
+    Задание, все попытки которого достались упавшим обработчикам, больше
+    не проводится через шлюз: заказ отменяется.
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                PaymentJob.objects.filter(status__in=('queued', 'running'), run_at__lte=now)
+                .select_related('order')
+                .order_by('run_at')
+                .select_for_update(skip_locked=True, of=('self',))
+                .first()
+            )
+            if job is None:
+                return None
+            exhausted = job.attempts >= MAX_ATTEMPTS
+            job.status = 'running'
+            if not exhausted:
+                job.attempts += 1
+            job.run_at = now + JOB_TIMEOUT
+            job.save(update_fields=['status', 'attempts', 'run_at', 'updated_at'])
+        if not exhausted:
+            return job
+        # заказ блокируется уже вне транзакции с заданием — в том же порядке, что в finish_job
+        finish_job(job, 'cancelled', job_status='failed',
+                   error=job.last_error or "обработчик не завершил последнюю попытку")
+
+
+def _current(job):
+    # аренда ещё наша: иначе задание уже перехватил другой обработчик
+    return PaymentJob.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+
+
+def finish_job(job, order_status, job_status='done', error=''):
+    """Записывает итог оплаты: статус заказа и задания меняются в одной транзакции."""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=job.order_id)
+        if not _current(job).update(status=job_status, last_error=error, updated_at=timezone.now()):
+            return False
+        if order.status not in FINAL_STATUSES:
+            order.status = order_status
+            order.save(update_fields=['status'])
+    return True
+
+
+def retry_job(job, error):
+    """Откладывает задание с экспоненциальной паузой; после MAX_ATTEMPTS заказ отменяется."""
+    if job.attempts >= MAX_ATTEMPTS:
+        return finish_job(job, 'cancelled', job_status='failed', error=error)
+    delay = min(RETRY_BASE * 2 ** (job.attempts - 1), RETRY_MAX)
+    # разброс, чтобы после сбоя шлюза повторы не приходили одной волной
+    delay *= random.uniform(0.5, 1.0)
+    now = timezone.now()
+    return bool(_current(job).update(
+        status='queued', run_at=now + timedelta(seconds=delay), last_error=error, updated_at=now,
+    ))
+
+
+def process_next(gateway=None):
+    """Проводит одно задание через шлюз; возвращает его или None, если очередь пуста."""
+    job = claim_job()
+    if job is None:
+        return None
+    gateway = gateway or get_gateway()
+    try:
+        approved = gateway.charge(job.idempotency_key, job.order.total_amount)
+        finish_job(job, 'completed' if approved else 'cancelled')
+    except GatewayError as exc:
+        retry_job(job, str(exc))
+    except Exception as exc:
+        # сбой БД, кэша или ошибка в коде: задание не должно висеть до конца
+        # аренды; повтор безопасен — шлюз вернёт тот же ответ по ключу
+        logger.exception("Оплата заказа #%s: попытка %s завершилась ошибкой", job.order_id, job.attempts)
+        retry_job(job, f"{type(exc).__name__}: {exc}")
+    return job
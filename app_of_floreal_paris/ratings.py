@@ -0,0 +1,42 @@
+from django.db.models import Case, Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Product, Review
+
+# Рейтинг товара хранится в самой строке Product (rating_count, rating_sum,
+# rating_avg) и меняется одним UPDATE при добавлении/удалении отзыва —
+# без пересчёта агрегатов по всем отзывам.
+
+
+def apply_review(product_id, rating, delta):
+    """
+    delta = +1 при добавлении отзыва с оценкой rating, -1 при удалении.
+    """
+    count = F('rating_count') + delta
+    total = F('rating_sum') + delta * rating
+    Product.objects.filter(pk=product_id).update(
+        rating_count=count,
+        rating_sum=total,
+        rating_avg=Case(
+            When(rating_count__lte=-delta, then=Value(0)),
+            default=Cast(total, DecimalField(max_digits=6, decimal_places=2)) / count,
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        ),
+    )
+
+
+def recompute_ratings(queryset=None):
+    """
+    Пересчитывает агрегаты по отзывам с нуля — для массовой загрузки
+    через bulk_create, где сигналы не срабатывают.
+    """
+    products = Product.objects.all() if queryset is None else queryset
+    per_product = Review.objects.filter(product=OuterRef('pk')).values('product')
+    count = Coalesce(Subquery(per_product.annotate(n=Count('id')).values('n')), Value(0))
+    total = Coalesce(Subquery(per_product.annotate(s=Sum('rating')).values('s')), Value(0))
+    products.update(rating_count=count, rating_sum=Cast(total, IntegerField()))
+    products.update(rating_avg=Case(
+        When(rating_count=0, then=Value(0)),
+        default=Cast(F('rating_sum'), DecimalField(max_digits=6, decimal_places=2)) / F('rating_count'),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    ))
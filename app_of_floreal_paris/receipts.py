@@ -0,0 +1,114 @@
+import io
+import os
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# PDF-чек рендерится один раз на заказ и лежит в media-хранилище под
+# receipts/<transaction_id>.pdf; повторные скачивания отдают готовый файл.
+# Состав и сумма заказа после оформления не меняются, поэтому файл не устаревает.
+RECEIPT_DIR = 'receipts'
+# Встроенные шрифты reportlab не содержат кириллицы — нужен TTF; DejaVu Sans
+# лежит в статике приложения, чтобы чек не зависел от шрифтов ОС
+RECEIPT_FONT_PATH = getattr(
+    settings, 'RECEIPT_FONT_PATH',
+    os.path.join(os.path.dirname(__file__), 'static', 'fonts', 'DejaVuSans.ttf'),
+)
+RECEIPT_FONT = 'ReceiptFont'
+
+_font_name = None
+
+
+def _font():
+    global _font_name
+    if _font_name is None:
+        # без кириллического шрифта чек нечитаем, а ensure_receipt сохранил бы
+        # его навсегда — поэтому ошибка, а не запасной Helvetica
+        try:
+            pdfmetrics.registerFont(TTFont(RECEIPT_FONT, RECEIPT_FONT_PATH))
+        except Exception as exc:
+            raise ImproperlyConfigured(
+                f"Не удалось загрузить шрифт чека RECEIPT_FONT_PATH={RECEIPT_FONT_PATH!r}: {exc}"
+            ) from exc
+        _font_name = RECEIPT_FONT
+    return _font_name
+
+
+def receipt_name(order):
+    return f'{RECEIPT_DIR}/{order.transaction_id}.pdf'
+
+
+def receipt_lines(order):
+    """Строки чека: (название, количество, цена, сумма)."""
+    return [
+        (item.title, item.quantity, item.price, item.total)
+        for item in order.items.order_by('id')
+    ]
+
+
+def render_receipt(order):
+    """Возвращает PDF чека в байтах."""
+    font = _font()
+    styles = getSampleStyleSheet()
+    for style in styles.byName.values():
+        style.fontName = font
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=f'Чек {order.transaction_id}',
+        leftMargin=20 * mm, rightMargin=20 * mm, topMargin=20 * mm, bottomMargin=20 * mm,
+    )
+    rows = [['Товар', 'Кол-во', 'Цена, ₽', 'Сумма, ₽']]
+    rows += [
+        [Paragraph(escape(title), styles['Normal']), quantity, f'{price:.2f}', f'{total:.2f}']
+        for title, quantity, price, total in receipt_lines(order)
+    ]
+    rows.append(['Итого', '', '', f'{order.total_amount:.2f}'])
+    table = Table(rows, colWidths=[90 * mm, 20 * mm, 30 * mm, 30 * mm], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), font),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.black),
+        ('LINEABOVE', (0, -1), (-1, -1), 0.5, colors.black),
+    ]))
+
+    buyer = escape(order.user.username) if order.user_id else '—'
+    doc.build([
+        Paragraph('Floreal Paris — чек', styles['Title']),
+        Paragraph(f'Заказ № {order.id} от {order.created_at:%d.%m.%Y %H:%M}', styles['Normal']),
+        Paragraph(f'Транзакция: {order.transaction_id}', styles['Normal']),
+        Paragraph(f'Покупатель: {buyer}', styles['Normal']),
+        Spacer(1, 8 * mm),
+        table,
+        Spacer(1, 8 * mm),
+        Paragraph(f'Подпись: {order.digital_signature or "—"}', styles['Code']),
+    ])
+    return buffer.getvalue()
+
+
+def ensure_receipt(order, force=False):
+    """
+    Создаёт файл чека в хранилище при первом обращении.
+    Возвращает (имя файла, создан ли он сейчас).
+    """
+    name = receipt_name(order)
+    if not force and default_storage.exists(name):
+        return name, False
+    if force and default_storage.exists(name):
+        default_storage.delete(name)
+    saved = default_storage.save(name, ContentFile(render_receipt(order)))
+    if saved != name:
+        # параллельный запрос успел сохранить файл раньше — оставляем его
+        default_storage.delete(saved)
+    return name, True
@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.core.paginator import Paginator
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Coalesce
+from taggit.models import TaggedItem
+
+from .models import Product
+
+# Полнотекстовый поиск по товарам (PostgreSQL). search_vector собирается из
+# title (вес A) и description (вес B) в конфигурации russian и имён тегов
+# (вес A) в simple; обновляется сигналами при сохранении товара и смене тегов.
+SEARCH_PAGE_SIZE = getattr(settings, 'SEARCH_PAGE_SIZE', 20)
+
+
+def build_search_vector(tag_names=''):
+    if isinstance(tag_names, str):
+        tag_names = Value(tag_names, output_field=TextField())
+    return (
+        SearchVector('title', config='russian', weight='A')
+        + SearchVector('description', config='russian', weight='B')
+        + SearchVector(tag_names, config='simple', weight='A')
+    )
+
+
+def update_search_vector(product):
+    tag_names = ' '.join(product.tags.names())
+    Product.objects.filter(pk=product.pk).update(
+        search_vector=build_search_vector(tag_names)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """
+    Пересчитывает search_vector для набора товаров одним UPDATE
+    (после bulk_create, где сигналы не срабатывают).
+    """
+    tag_names = TaggedItem.objects.filter(
+        content_type=ContentType.objects.get_for_model(Product),
+        object_id=OuterRef('pk'),
+    ).values('object_id').annotate(
+        names=StringAgg('tag__name', ' '),
+    ).values('names')
+    return queryset.update(search_vector=build_search_vector(
+        Coalesce(Subquery(tag_names), Value(''), output_field=TextField())
+    ))
+
+
+def build_search_query(query):
+    return (
+        SearchQuery(query, config='russian', search_type='websearch')
+        | SearchQuery(query, config='simple', search_type='websearch')
+    )
+
+
+def search_products(query, queryset=None):
+    """
+    Товары, найденные по запросу, отсортированные по релевантности.
+    """
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    search_query = build_search_query(query)
+    return queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query),
+    ).order_by('-rank', '-views', 'id')
+
+
+def search_products_fuzzy(query, queryset=None):
+    """
+    Запасной вариант при пустой выдаче: похожие по триграммам названия.
+    Оператор % (порог pg_trgm.similarity_threshold) использует GIN-индекс по title.
+    """
+    if queryset is None:
+        queryset = Product.objects.filter(is_active=True)
+    return queryset.filter(title__trigram_similar=query).annotate(
+        similarity=TrigramSimilarity('title', query),
+    ).order_by('-similarity', 'id')
+
+
+def search_products_page(query, page_number=1, queryset=None, per_page=SEARCH_PAGE_SIZE):
+    """
+    Страница результатов поиска. Если полнотекстовый поиск ничего не нашёл,
+    выдача строится по триграммам; у страницы выставляется флаг fuzzy.
+    """
+    page = Paginator(search_products(query, queryset), per_page).get_page(page_number)
+    page.fuzzy = False
+    if not page.paginator.count:
+        page = Paginator(search_products_fuzzy(query, queryset), per_page).get_page(page_number)
+        page.fuzzy = True
+    return page
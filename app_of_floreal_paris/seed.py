@@ -0,0 +1,299 @@
+import io
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image
+from taggit.models import TaggedItem
+
+from .bulk import resolve_tags
+from .models import (
+    Cart, CartItem, ChatRoom, Message, Order, OrderItem, Product, Review, User, UserProfile
+)
+from .ratings import recompute_ratings
+from .search import refresh_search_vectors
+
+# Генератор тестового маркетплейса: продавцы, покупатели с профилями, товары
+# с тегами и картинками-заглушками, корзины, заказы, отзывы и чаты. Данные
+# зависят только от seed, поэтому прогоны нагрузочных тестов воспроизводимы.
+# Строки пишутся пачками по chunk_size: на PostgreSQL через COPY FROM STDIN,
+# иначе bulk_create. Сигналы при этом не срабатывают — поисковые векторы
+# и рейтинги пересчитываются в конце.
+FLOWERS = ['Розы', 'Пионы', 'Тюльпаны', 'Хризантемы', 'Лилии', 'Орхидеи', 'Гортензии', 'Ромашки']
+ADJECTIVES = ['красные', 'белые', 'нежные', 'садовые', 'голландские', 'полевые', 'кустовые']
+TAGS = ['roses', 'wedding', 'birthday', 'spring', 'premium', 'bouquet', 'pot', 'gift']
+COLORS = ['#f4c2c2', '#ffd1dc', '#e6e6fa', '#fffacd', '#c1e1c1', '#ffdab9', '#f0e68c', '#dda0dd']
+PASSWORD = 'password'
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class MarketplaceSeeder:
+    """
+    Пошаговый генератор; seed_marketplace() — обёртка со всеми шагами.
+    Методы возвращают списки id вставленных строк.
+    """
+
+    def __init__(self, prefix='seed', seed=0, chunk_size=10000, use_copy=None,
+                 using='default', log=None):
+        self.prefix = prefix
+        self.seed = seed
+        self.rnd = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.using = using
+        self.connection = connections[using]
+        if use_copy is None:
+            use_copy = self.connection.vendor == 'postgresql'
+        self.use_copy = use_copy
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.password = make_password(PASSWORD)
+
+    # --- запись ---
+
+    def insert(self, model, objects, return_ids=True):
+        """Пишет объекты пачками; возвращает id в порядке вставки."""
+        ids = []
+        for batch in _chunks(objects, self.chunk_size):
+            with transaction.atomic(using=self.using):
+                if self.use_copy:
+                    ids += self._copy(model, batch, return_ids)
+                else:
+                    model.objects.using(self.using).bulk_create(batch, batch_size=1000)
+                    if return_ids:
+                        ids += [obj.pk for obj in batch]
+        return ids
+
+    def _copy(self, model, batch, return_ids):
+        fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+        quote = self.connection.ops.quote_name
+        table = model._meta.db_table
+        ids = []
+        with self.connection.cursor() as cursor:
+            if return_ids:
+                # COPY не возвращает id: берём их из последовательности таблицы
+                # заранее, одним запросом, и пишем явно — чужие вставки в ту же
+                # таблицу получат другие значения и не попадут в список
+                pk = model._meta.pk
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                    [table, pk.column, len(batch)],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                fields = [pk] + fields
+                for obj, pk_value in zip(batch, ids):
+                    obj.pk = pk_value
+
+            buffer = io.StringIO()
+            for obj in batch:
+                buffer.write('\t'.join(
+                    _copy_value(f.get_db_prep_save(f.pre_save(obj, True), self.connection))
+                    for f in fields
+                ))
+                buffer.write('\n')
+            buffer.seek(0)
+            columns = ', '.join(quote(f.column) for f in fields)
+            cursor.cursor.copy_expert(f'COPY {quote(table)} ({columns}) FROM STDIN', buffer)
+        return ids
+
+    # --- шаги ---
+
+    def placeholder_images(self, count=len(COLORS)):
+        names = []
+        for i in range(count):
+            name = f'products/seed/placeholder_{i}.jpg'
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                Image.new('RGB', (960, 960), COLORS[i % len(COLORS)]).save(buffer, 'JPEG')
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def users(self, role, count):
+        ids = self.insert(User, (
+            User(
+                username=f'{self.prefix}_{role}_{i}', email=f'{self.prefix}_{role}_{i}@example.com',
+                role=role, password=self.password, date_joined=self.now,
+            )
+            for i in range(count)
+        ))
+        # профиль обычно создаёт сигнал post_save
+        self.insert(UserProfile, (UserProfile(user_id=user_id) for user_id in ids), return_ids=False)
+        self.log(f"{role}: {len(ids)}")
+        return ids
+
+    def products(self, count, seller_ids, images):
+        rnd = self.rnd
+        # продавец каждого товара нужен чатам; список держим в памяти
+        self.product_sellers = [rnd.choice(seller_ids) for _ in range(count)]
+        ids = self.insert(Product, (
+            Product(
+                seller_id=self.product_sellers[i],
+                title=f'{rnd.choice(FLOWERS)} {rnd.choice(ADJECTIVES)} №{i}',
+                description=f'Букет из {rnd.randint(3, 101)} цветов',
+                price=Decimal(rnd.randint(500, 20000)) / 100,
+                status=rnd.choice(Product.STATUS_CHOICES)[0],
+                image=rnd.choice(images) if images else '',
+                views=rnd.randint(0, 5000),
+            )
+            for i in range(count)
+        ))
+        self.log(f"товары: {len(ids)}")
+        return ids
+
+    def tags(self, product_ids):
+        tag_ids = resolve_tags(TAGS)
+        content_type = ContentType.objects.get_for_model(Product)
+        rnd = self.rnd
+        self.insert(TaggedItem, (
+            TaggedItem(content_type_id=content_type.pk, object_id=product_id, tag_id=tag_ids[name])
+            for product_id in product_ids
+            for name in rnd.sample(TAGS, rnd.randint(1, 3))
+        ), return_ids=False)
+
+    def reviews(self, count, product_ids, buyer_ids):
+        # пара (товар, покупатель) уникальна: k-й отзыв — товар k % P,
+        # покупатель (k // P + k % P) % U
+        products, buyers = len(product_ids), len(buyer_ids)
+        count = min(count, products * buyers)
+        rnd = self.rnd
+        self.insert(Review, (
+            Review(
+                product_id=product_ids[k % products],
+                user_id=buyer_ids[(k // products + k % products) % buyers],
+                rating=rnd.randint(1, 5),
+                comment='Отличный букет',
+            )
+            for k in range(count)
+        ), return_ids=False)
+        self.log(f"отзывы: {count}")
+
+    def carts(self, count, buyer_ids, product_ids):
+        rnd = self.rnd
+        # не больше одной активной корзины на покупателя
+        cart_ids = self.insert(Cart, (Cart(user_id=buyer_id) for buyer_id in buyer_ids[:count]))
+        self.insert(CartItem, (
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=rnd.randint(1, 3))
+            for cart_id in cart_ids
+            for product_id in rnd.sample(product_ids, min(len(product_ids), rnd.randint(1, 5)))
+        ), return_ids=False)
+        self.log(f"корзины: {len(cart_ids)}")
+        return cart_ids
+
+    def orders(self, count, buyer_ids, product_ids):
+        rnd = self.rnd
+        ids = []
+        for batch in _chunks(range(count), self.chunk_size):
+            lines = [
+                [(rnd.choice(product_ids), rnd.randint(1, 3)) for _ in range(rnd.randint(1, 4))]
+                for _ in batch
+            ]
+            # названия и цены для снимка строк — одним запросом на пачку
+            products = Product.objects.using(self.using).in_bulk(
+                {product_id for order_lines in lines for product_id, _ in order_lines}
+            )
+            orders = []
+            for number, order_lines in zip(batch, lines):
+                order = Order(
+                    user_id=rnd.choice(buyer_ids),
+                    # детерминированный, но уникальный между прогонами с разным prefix
+                    transaction_id=uuid.uuid5(uuid.NAMESPACE_URL, f'{self.prefix}/{self.seed}/order/{number}'),
+                    total_amount=sum(products[p].price * q for p, q in order_lines),
+                    status=rnd.choice(Order.STATUS_CHOICES)[0],
+                    created_at=self.now - timedelta(minutes=rnd.randint(0, 365 * 24 * 60)),
+                )
+                order.generate_signature(commit=False)
+                orders.append(order)
+            order_ids = self.insert(Order, orders)
+            self.insert(OrderItem, (
+                OrderItem(order_id=order_id, product_id=p, title=products[p].title,
+                          price=products[p].price, quantity=q)
+                for order_id, order_lines in zip(order_ids, lines)
+                for p, q in order_lines
+            ), return_ids=False)
+            ids += order_ids
+        self.log(f"заказы: {len(ids)}")
+        return ids
+
+    def chats(self, count, product_ids, buyer_ids, messages_per_chat):
+        rnd = self.rnd
+        rooms = []
+        for index in rnd.sample(range(len(product_ids)), min(count, len(product_ids))):
+            rooms.append((product_ids[index], rnd.choice(buyer_ids), self.product_sellers[index]))
+        room_ids = self.insert(ChatRoom, (
+            ChatRoom(product_id=product_id, buyer_id=buyer_id, seller_id=seller_id)
+            for product_id, buyer_id, seller_id in rooms
+        ))
+        self.insert(Message, (
+            Message(
+                chat_room_id=room_id,
+                sender_id=buyer_id if i % 2 == 0 else seller_id,
+                content=f'Сообщение {i}',
+                read=i < messages_per_chat - 2,
+            )
+            for room_id, (_, buyer_id, seller_id) in zip(room_ids, rooms)
+            for i in range(messages_per_chat)
+        ), return_ids=False)
+        self.log(f"чаты: {len(room_ids)}, сообщений: {len(room_ids) * messages_per_chat}")
+        return room_ids
+
+    def finalize(self, product_ids):
+        for batch in _chunks(product_ids, self.chunk_size):
+            with transaction.atomic(using=self.using):
+                products = Product.objects.using(self.using).filter(pk__gte=batch[0], pk__lte=batch[-1])
+                refresh_search_vectors(products)
+                recompute_ratings(products)
+        self.log("поисковые векторы и рейтинги пересчитаны")
+
+
+def seed_marketplace(sellers=10, buyers=50, products=500, reviews=1000, orders=300,
+                     carts=0, chats=50, messages_per_chat=20, image=None, prefix='seed',
+                     seed=0, chunk_size=10000, use_copy=None, log=None):
+    """
+    Создаёт набор данных и возвращает SimpleNamespace со списками id:
+    seller_ids, buyer_ids, product_ids, cart_ids, order_ids, room_ids.
+    image — имя файла в хранилище для всех товаров; по умолчанию
+    создаются цветные заглушки. Пароль у всех пользователей — PASSWORD.
+    """
+    seeder = MarketplaceSeeder(prefix=prefix, seed=seed, chunk_size=chunk_size,
+                               use_copy=use_copy, log=log)
+    images = [image] if image else seeder.placeholder_images()
+    seller_ids = seeder.users('seller', sellers)
+    buyer_ids = seeder.users('buyer', buyers)
+    product_ids = seeder.products(products, seller_ids, images) if seller_ids else []
+    seeder.tags(product_ids)
+    have_both = bool(product_ids and buyer_ids)
+    if have_both:
+        seeder.reviews(reviews, product_ids, buyer_ids)
+    cart_ids = seeder.carts(carts, buyer_ids, product_ids) if have_both else []
+    order_ids = seeder.orders(orders, buyer_ids, product_ids) if have_both else []
+    room_ids = seeder.chats(chats, product_ids, buyer_ids, messages_per_chat) if have_both else []
+    seeder.finalize(product_ids)
+    return SimpleNamespace(
+        seller_ids=seller_ids, buyer_ids=buyer_ids, product_ids=product_ids,
+        cart_ids=cart_ids, order_ids=order_ids, room_ids=room_ids,
+    )
@@ -0,0 +1,108 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cart_cache import invalidate_cart_summary
+from .models import Cart, CartItem, Product, Review
+from .page_cache import bump_version
+from .ratings import apply_review
+from .search import update_search_vector
+
+
+# --- Сводка корзины ---
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def reset_cart_summary_for_cart(sender, instance, **kwargs):
+    # например, корзина деактивирована при оформлении заказа
+    invalidate_cart_summary(instance.user_id)
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def reset_cart_summary_for_item(sender, instance, **kwargs):
+    if CartItem.cart.is_cached(instance):
+        user_id = instance.cart.user_id
+    else:
+        user_id = Cart.objects.filter(pk=instance.cart_id).values_list('user_id', flat=True).first()
+    invalidate_cart_summary(user_id)
+
+
+@receiver(post_save, sender=Product)
+def reset_cart_summary_for_product(sender, instance, created, update_fields=None, **kwargs):
+    # цена могла измениться — сбрасываем сводку всем, у кого товар в активной корзине;
+    # сводка зависит только от цены, сохранения других полей её не трогают
+    if created or (update_fields is not None and 'price' not in update_fields):
+        return
+    user_ids = CartItem.objects.filter(
+        product=instance,
+        cart__is_active=True,
+    ).values_list('cart__user_id', flat=True).distinct()
+    invalidate_cart_summary(*user_ids)
+
+
+# --- Поисковый индекс товаров ---
+
+# поля товара, из которых собирается search_vector (теги — m2m, см. ниже)
+SEARCH_FIELDS = {'title', 'description'}
+
+
+@receiver(post_save, sender=Product)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=['views']) и т.п. не меняет индексируемый текст
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    update_search_vector(instance)
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def refresh_search_vector_on_tags(sender, instance, action, **kwargs):
+    if isinstance(instance, Product) and action in ('post_add', 'post_remove', 'post_clear'):
+        update_search_vector(instance)
+
+
+# --- Кэш главной страницы ---
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def reset_home_blocks(sender, instance, **kwargs):
+    bump_version('home_popular', 'home_new')
+
+
+# --- Кэш каталога: страницы и счётчики тегов (catalog.py, facets.py) ---
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def reset_catalog(sender, instance, **kwargs):
+    bump_version('catalog')
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def reset_catalog_on_tags(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version('catalog')
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def touch_product_on_tags(sender, instance, action, pk_set, **kwargs):
+    # теги входят в ответ API, а его ETag/Last-Modified строятся по updated_at
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    product_ids = [instance.pk] if isinstance(instance, Product) else pk_set
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+# --- Рейтинг товара ---
+
+@receiver(post_save, sender=Review)
+def add_review_rating(sender, instance, created, **kwargs):
+    if created:
+        apply_review(instance.product_id, instance.rating, +1)
+        bump_version('catalog_rating')
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    apply_review(instance.product_id, instance.rating, -1)
+    bump_version('catalog_rating')
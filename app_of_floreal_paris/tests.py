@@ -1,3 +1,530 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import chat_broker, payments, view_counter
+from .cart_cache import get_cart_summary
+from .middleware import RequestTimingMiddleware
+from .models import Cart, CartItem, ChatRoom, Order, PaymentJob, Product, User
+from .orders import place_order
+from .receipts import receipt_name
+from .seed import seed_marketplace
+
+# Бенчмарки «горячих» страниц. Каждый сценарий выполняется BENCHMARK_RUNS раз;
+# в конце печатается таблица p50/p95/max, а превышение бюджета SQL-запросов
+# роняет тест — N+1 ловится здесь, а не на проде.
+#   BENCHMARK_RUNS=50 python manage.py test app_of_floreal_paris dashboard
+BENCHMARK_RUNS = int(os.environ.get('BENCHMARK_RUNS', 10))
+MEDIA_ROOT = tempfile.mkdtemp(prefix='floreal-bench-')
+IMAGE = 'products/bench.jpg'
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+# Тесты идут в одном процессе, поэтому кэш в памяти: бюджеты SQL считают
+# запросы приложения, а кэш в БД (settings.CACHES) добавлял бы свои
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    VIEW_COUNTER_FLUSH_THREAD=False,
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'renditions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    },
+)
+class BenchmarkCase(TestCase):
+    """
+    Базовый класс: набор данных из seed_marketplace и метод bench().
+    """
+    results = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.results:
+            sys.stderr.write(f"\n{cls.__name__} ({BENCHMARK_RUNS} прогонов)\n")
+            sys.stderr.write(f"{'сценарий':<32}{'SQL':>5}{'p50, мс':>10}{'p95, мс':>10}{'max, мс':>10}\n")
+            for name, queries, timings in cls.results:
+                sys.stderr.write(
+                    f"{name:<32}{queries:>5}{percentile(timings, 50):>10.2f}"
+                    f"{percentile(timings, 95):>10.2f}{max(timings):>10.2f}\n"
+                )
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        path = os.path.join(MEDIA_ROOT, IMAGE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', (64, 64), 'pink').save(path)
+        data = seed_marketplace(
+            sellers=5, buyers=20, products=120, reviews=400, orders=60,
+            chats=15, messages_per_chat=30, image=IMAGE,
+        )
+        cls.seller = User.objects.get(pk=data.seller_ids[0])
+        cls.buyer = User.objects.get(pk=data.buyer_ids[0])
+        cls.product = Product.objects.get(pk=data.product_ids[0])
+        cls.cart_products = list(Product.objects.filter(pk__in=data.product_ids[1:11]))
+        cls.room = ChatRoom.objects.select_related('buyer').get(pk=data.room_ids[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        # фоновый поток в тестах выключен: буфер просмотров пишем сами,
+        # внутри транзакции теста
+        view_counter.flush()
+
+    def bench(self, name, budget, request, setup=None, cold_cache=True, runs=BENCHMARK_RUNS):
+        """
+        request — функция без аргументов, возвращающая ответ.
+        setup вызывается перед каждым прогоном и в замер не попадает.
+        """
+        timings, worst = [], None
+        for _ in range(runs):
+            if setup is not None:
+                setup()
+            if cold_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = request()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.assertLess(response.status_code, 400, f"{name}: статус {response.status_code}")
+            if worst is None or len(ctx) > len(worst):
+                worst = ctx.captured_queries
+        self.results.append((name, len(worst), timings))
+        self.assertLessEqual(
+            len(worst), budget,
+            f"{name}: {len(worst)} SQL-запросов при бюджете {budget}:\n"
+            + "\n".join(q['sql'] for q in worst),
+        )
+        return response
+
+
+class CatalogBenchmarks(BenchmarkCase):
+
+    def test_home_anonymous(self):
+        url = reverse('home')
+        self.bench('home (аноним, холодный кэш)', 2, lambda: self.client.get(url))
+        self.bench('home (аноним, из кэша)', 0, lambda: self.client.get(url), cold_cache=False)
+
+    def test_home_anonymous_csrf(self):
+        # в кэшированной странице нет чужого токена, а cookie ставится каждому
+        url = reverse('home')
+        first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+        first.get(url)
+        response = second.get(url)
+        first_token = first.cookies[settings.CSRF_COOKIE_NAME].value
+        second_token = second.cookies[settings.CSRF_COOKIE_NAME].value
+        self.assertNotIn(first_token.encode(), response.content)
+        login = second.post(reverse('login'), {'username': 'x', 'password': 'y'}, HTTP_X_CSRFTOKEN=second_token)
+        self.assertNotEqual(login.status_code, 403)
+
+    def test_home_logged_in(self):
+        self.client.force_login(self.buyer)
+        url = reverse('home')
+        self.bench('home (покупатель)', 5, lambda: self.client.get(url))
+        self.bench('home (покупатель, фрагменты)', 2, lambda: self.client.get(url), cold_cache=False)
+
+    def test_product_list(self):
+        url = reverse('product_list')
+        response = self.bench('product_list', 2, lambda: self.client.get(url))
+        self.bench('product_list (из кэша)', 0, lambda: self.client.get(url), cold_cache=False)
+        cursor_url = url + response.context['products'].next_url
+        self.bench('product_list (2-я страница)', 2, lambda: self.client.get(cursor_url))
+        self.bench('product_list (json)', 1, lambda: self.client.get(url, {'format': 'json'}))
+
+    def test_product_list_filters(self):
+        url = reverse('product_list')
+        params = {'min_price': '20', 'max_price': '150.00', 'status': 'in_stock', 'sort': 'price'}
+        response = self.bench('product_list (цена, статус)', 2, lambda: self.client.get(url, params))
+        self.bench('product_list (цена, статус, кэш)', 0, lambda: self.client.get(url, params), cold_cache=False)
+        first = list(response.context['products'])
+        second_page = self.client.get(url + response.context['products'].next_url).context['products']
+        second = list(second_page)
+        back = self.client.get(url + second_page.previous_url).context['products']
+        self.assertEqual([product.pk for product in back], [product.pk for product in first])
+        prices = [product.price for product in first + second]
+        self.assertEqual(prices, sorted(prices))
+        for product in first + second:
+            self.assertTrue(20 <= product.price <= 150 and product.status == 'in_stock')
+        # тот же набор фильтров в другой записи — та же запись кэша
+        same = {'sort': 'price', 'status': 'in_stock', 'max_price': '150', 'min_price': '20.0'}
+        self.bench('product_list (другой порядок параметров)', 0, lambda: self.client.get(url, same),
+                   cold_cache=False)
+
+        response = self.client.get(url, {'seller': self.seller.pk, 'min_price': '100', 'max_price': '10'})
+        self.assertIn('max_price', response.context['filter_form'].errors)
+        self.assertTrue(all(product.seller_id == self.seller.pk for product in response.context['products']))
+
+    def test_product_list_by_tags(self):
+        url = reverse('product_list')
+        facets = self.client.get(url).context['facets']
+        slugs = [facet['slug'] for facet in facets[:2]]
+        response = self.bench('product_list (2 тега)', 2, lambda: self.client.get(url, {'tag': slugs}))
+        products = list(response.context['products'])
+        self.assertTrue(products)
+        for product in products:
+            self.assertLessEqual(set(slugs), set(product.tags.values_list('slug', flat=True)))
+        selected = [facet for facet in response.context['facets'] if facet['selected']]
+        self.assertEqual({facet['slug'] for facet in selected}, set(slugs))
+
+    def test_product_detail(self):
+        self.client.force_login(self.buyer)
+        url = reverse('product_detail', args=[self.product.pk])
+        self.bench('product_detail', 5, lambda: self.client.get(url))
+
+    def test_edit_product(self):
+        self.client.force_login(self.seller)
+        product = self.seller.products.first()
+        # пока продавец редактирует, просмотры и рейтинг меняются через F()
+        Product.objects.filter(pk=product.pk).update(views=F('views') + 7, rating_count=F('rating_count') + 1)
+        url = reverse('edit_product', args=[product.pk])
+        with open(os.path.join(MEDIA_ROOT, IMAGE), 'rb') as image:
+            response = self.client.post(url, {
+                'title': 'Пионы', 'description': product.description, 'price': '99.00',
+                'status': product.status, 'tags': 'пионы, букет', 'image': image,
+            })
+        self.assertRedirects(response, reverse('product_detail', args=[product.pk]), fetch_redirect_response=False)
+        edited = Product.objects.get(pk=product.pk)
+        self.assertEqual((edited.title, edited.views, edited.rating_count),
+                         ('Пионы', product.views + 7, product.rating_count + 1))
+        self.assertEqual(set(edited.tags.names()), {'пионы', 'букет'})
+
+    def test_import_products_bad_rows(self):
+        # битые строки и цены пропускаются, остальная пачка импортируется
+        rows = [
+            {'seller': self.seller.username, 'title': 'Тюльпаны', 'price': '12.50', 'tags': 'тюльпаны'},
+            '{"seller": ',
+            {'seller': self.seller.username, 'title': 'NaN', 'price': 'NaN'},
+            {'seller': self.seller.username, 'title': 'Бесконечность', 'price': 'Infinity'},
+            {'seller': self.seller.username, 'title': 'Минус', 'price': '-1'},
+            {'seller': self.seller.username, 'title': 'Миллиард', 'price': '1000000000'},
+            {'seller': self.seller.username, 'title': 'Дробь', 'price': '1.005'},
+            [1, 2],
+            {'seller': self.seller.username, 'title': 'Ромашки', 'price': 7},
+        ]
+        path = os.path.join(MEDIA_ROOT, 'import.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write((row if isinstance(row, str) else json.dumps(row, ensure_ascii=False)) + '\n')
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_products', path, stdout=stdout, stderr=stderr)
+        self.assertIn('Импортировано: 2, пропущено: 7', stdout.getvalue())
+        self.assertEqual(stderr.getvalue().count('Запись'), 7)
+        self.assertEqual(set(Product.objects.filter(title__in=['Тюльпаны', 'Ромашки']).values_list('price', flat=True)),
+                         {Decimal('12.50'), Decimal('7')})
+
+    def test_renditions_created_on_first_view(self):
+        # товар из bulk_create (как в import_products) сигналов не получает:
+        # копия создаётся при первом показе
+        name = 'products/bench_bulk.jpg'
+        Image.new('RGB', (64, 64), 'white').save(os.path.join(MEDIA_ROOT, name))
+        product, = Product.objects.bulk_create([
+            Product(seller=self.seller, title='Из импорта', price=10, image=name),
+        ])
+        rendition = product.image_320
+        self.assertFalse(default_storage.exists(rendition.name))
+        response = self.client.get(reverse('api_product_detail', args=[product.pk]))
+        self.assertEqual(response.json()['thumbnail'], rendition.url)
+        self.assertTrue(default_storage.exists(rendition.name))
+
+    def test_view_flush_error(self):
+        # сбой записи не доходит до страницы, просмотры остаются в буфере
+        view_counter.record_view(None, self.product.pk)
+        with mock.patch.object(view_counter.Product.objects, 'filter', side_effect=DatabaseError), \
+                self.assertLogs('floreal.view_counter', 'ERROR'):
+            self.assertEqual(view_counter.safe_flush(), 0)
+        self.assertEqual(view_counter.pending_views(self.product.pk), 1)
+        views = self.product.views
+        self.assertEqual(view_counter.flush(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, views + 1)
+
+    async def test_request_timing_async(self):
+        # middleware не переводит асинхронную цепочку в синхронный режим
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(view)))
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        # запросы view из потока sync_to_async засчитаны этому запросу
+        self.assertTrue(response.has_header('Server-Timing'))
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries')
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_search(self):
+        url = reverse('search')
+        self.bench('search_view', 3, lambda: self.client.get(url, {'q': 'розы'}))
+
+    def test_search_vector_update_fields(self):
+        # сохранение без текстовых полей не пересчитывает search_vector
+        with CaptureQueriesContext(connection) as queries:
+            self.product.save(update_fields=['status'])
+        self.assertFalse([q for q in queries if 'search_vector' in q['sql']])
+        self.product.title = 'Незабудки'
+        self.product.save(update_fields=['title'])
+        self.assertEqual(Product.objects.get(search_vector=SearchQuery('незабудки', config='russian')), self.product)
+
+
+class CartBenchmarks(BenchmarkCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.buyer)
+        self.cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, product=product, quantity=2)
+            for product in self.cart_products
+        ])
+
+    def test_view_cart(self):
+        url = reverse('view_cart')
+        self.bench('view_cart (10 позиций)', 5, lambda: self.client.get(url))
+
+    def test_add_to_cart(self):
+        url = reverse('add_to_cart')
+        body = json.dumps({'product_id': self.product.pk, 'quantity': 1})
+        self.bench('add_to_cart', 9, lambda: self.client.post(url, body, content_type='application/json'))
+
+    def test_checkout(self):
+        def refill():
+            if Cart.objects.filter(user=self.buyer, is_active=True).exists():
+                return
+            cart = Cart.objects.create(user=self.buyer)
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product=product, quantity=1)
+                for product in self.cart_products
+            ])
+
+        url = reverse('checkout')
+        before = Order.objects.count()
+        self.bench('checkout (10 позиций)', 12, lambda: self.client.get(url), setup=refill)
+        self.assertEqual(Order.objects.count(), before + BENCHMARK_RUNS)
+
+    def test_cart_summary_price_change(self):
+        product = self.cart_products[0]
+        before = get_cart_summary(self.buyer.pk)['cart_total']
+        # сохранение без цены не ищет корзины с товаром и не сбрасывает сводку
+        with self.assertNumQueries(1):
+            product.save(update_fields=['views'])
+        product.price += 1
+        product.save(update_fields=['price'])
+        self.assertEqual(get_cart_summary(self.buyer.pk)['cart_total'], before + 2)
+
+    def test_checkout_twice(self):
+        # повторный запрос после коммита первого получает тот же заказ
+        order, created = place_order(self.buyer)
+        self.assertTrue(created)
+        self.assertEqual(place_order(self.buyer), (order, False))
+        response = self.client.get(reverse('checkout'))
+        self.assertRedirects(response, reverse('payment', args=[order.pk]), fetch_redirect_response=False)
+        # оплаченный заказ повторным оформлением не возвращается
+        Order.objects.filter(pk=order.pk).update(status='completed')
+        self.assertEqual(place_order(self.buyer), (None, False))
+
+
+
+class PaymentBenchmarks(BenchmarkCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.buyer)
+        cart = Cart.objects.create(user=self.buyer)
+        cart.items.create(product=self.product, quantity=2)
+        self.order, _ = place_order(self.buyer)
+        self.card = {'card_number': '4242 4242 4242 4242', 'expiry': '12/30', 'cvv': '123'}
+
+    def gateway(self, **options):
+        return payments.FakeGateway(**{'latency': 0, 'failure_rate': 0, 'decline_rate': 0, **options})
+
+    def test_payment(self):
+        def reset():
+            PaymentJob.objects.all().delete()
+            Order.objects.filter(pk=self.order.pk).update(status='pending')
+
+        url = reverse('payment', args=[self.order.pk])
+        # запрос только ставит задание, шлюз не вызывается
+        self.bench('payment (в очередь)', 9, lambda: self.client.post(url, self.card), setup=reset)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'processing')
+        self.assertEqual(self.order.payment_job.idempotency_key, self.order.transaction_id)
+        # повторная отправка формы не создаёт второго задания
+        self.assertRedirects(self.client.post(url, self.card), reverse('payment_result', args=[self.order.pk]))
+        self.assertEqual(PaymentJob.objects.count(), 1)
+
+        status_url = reverse('payment_status', args=[self.order.pk])
+        self.bench('payment_status', 3, lambda: self.client.get(status_url))
+        self.assertEqual(self.client.get(status_url).json(), {'status': 'processing', 'final': False})
+
+        self.assertIsNotNone(payments.process_next(self.gateway()))
+        self.assertIsNone(payments.process_next(self.gateway()))
+        self.assertEqual(self.client.get(status_url).json(), {'status': 'completed', 'final': True})
+        self.assertEqual(PaymentJob.objects.get().status, 'done')
+
+    def test_payment_retries(self):
+        payments.enqueue_payment(self.order)
+        failing = self.gateway(failure_rate=1)
+        for attempt in range(1, payments.MAX_ATTEMPTS + 1):
+            PaymentJob.objects.update(run_at=timezone.now())
+            payments.process_next(failing)
+            job = PaymentJob.objects.get()
+            self.assertEqual(job.attempts, attempt)
+            if attempt < payments.MAX_ATTEMPTS:
+                # до следующей попытки задание не выдаётся
+                self.assertEqual((job.status, job.order.status), ('queued', 'processing'))
+                self.assertGreater(job.run_at, timezone.now())
+                self.assertIsNone(payments.claim_job())
+        self.assertEqual((job.status, job.order.status), ('failed', 'cancelled'))
+
+    def test_payment_unexpected_error(self):
+        payments.enqueue_payment(self.order)
+        broken = self.gateway()
+        broken.charge = mock.Mock(side_effect=RuntimeError('кэш недоступен'))
+        with self.assertLogs('floreal.payments', 'ERROR'):
+            payments.process_next(broken)
+        job = PaymentJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('кэш недоступен', job.last_error)
+
+    def test_dead_worker_attempts(self):
+        # все попытки достались упавшим обработчикам: задание не проводится снова
+        payments.enqueue_payment(self.order)
+        PaymentJob.objects.update(status='running', attempts=payments.MAX_ATTEMPTS, run_at=timezone.now())
+        charge = mock.Mock()
+        self.assertIsNone(payments.process_next(mock.Mock(charge=charge)))
+        charge.assert_not_called()
+        job = PaymentJob.objects.select_related('order').get()
+        self.assertEqual((job.status, job.order.status), ('failed', 'cancelled'))
+
+    def test_expired_lease(self):
+        payments.enqueue_payment(self.order)
+        stale = payments.claim_job()
+        # обработчик «завис»: после истечения аренды задание забирает другой
+        PaymentJob.objects.update(run_at=timezone.now())
+        fresh = payments.claim_job()
+        self.assertEqual((fresh.pk, fresh.attempts), (stale.pk, 2))
+        self.assertFalse(payments.finish_job(stale, 'cancelled'))
+        self.assertTrue(payments.finish_job(fresh, 'completed'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'completed')
+
+    def test_receipt(self):
+        url = reverse('generate_receipt', args=[self.order.transaction_id])
+        self.bench('generate_receipt', 4, lambda: self.client.get(url))
+        # кириллица набрана встроенным в приложение шрифтом, а не Helvetica
+        with default_storage.open(receipt_name(self.order)) as pdf:
+            self.assertIn(b'DejaVuSans', pdf.read())
+
+    def test_gateway_idempotency(self):
+        key = self.order.transaction_id
+        self.assertTrue(self.gateway().charge(key, self.order.total_amount))
+        # повтор с тем же ключом получает первый ответ, а не новое решение
+        self.assertTrue(self.gateway(decline_rate=1).charge(key, self.order.total_amount))
+        with self.assertRaises(payments.GatewayError):
+            self.gateway(failure_rate=1).charge(Order().transaction_id, 1)
+
+
+class ChatBenchmarks(BenchmarkCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.room.buyer)
+
+    def test_chat_list(self):
+        url = reverse('chat_list')
+        self.bench('chat_list', 4, lambda: self.client.get(url))
+
+    def test_chat_messages(self):
+        url = reverse('chat_messages', args=[self.room.pk])
+        self.bench('chat_messages', 5, lambda: self.client.get(url))
+        last_id = self.room.messages.order_by('-id').values_list('id', flat=True).first()
+        self.bench('chat_messages (since)', 5, lambda: self.client.get(url, {'since': last_id}))
+
+    def test_send_to_closed_subscriber(self):
+        # поток SSE оборвался вместе с циклом событий, не успев отписаться
+        broker = chat_broker.get_broker()
+        loop = asyncio.new_event_loop()
+        loop.close()
+        broker._add(self.room.pk, (loop, asyncio.Queue()))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('send_message', args=[self.room.pk]), {'content': 'Привет'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.room.pk, broker._subscribers)
+
+
+class ApiBenchmarks(BenchmarkCase):
+
+    def test_product_list(self):
+        url = reverse('api_product_list')
+        response = self.bench('api products', 1, lambda: self.client.get(url))
+        data = response.json()
+        self.assertEqual(len(data['results']), 24)
+        self.assertTrue(data['next'].startswith('http'))
+        self.bench('api products (+теги)', 2, lambda: self.client.get(url, {'fields': 'id,title,tags'}))
+        self.bench('api products (цена, 100 шт.)', 1,
+                   lambda: self.client.get(url, {'sort': 'price', 'max_price': '150', 'limit': 100}))
+        self.assertEqual(self.client.get(url, {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': 1000}).status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('api_product_detail', args=[self.product.pk])
+        response = self.bench('api product detail', 2, lambda: self.client.get(url))
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        not_modified = self.bench('api product detail (304)', 1,
+                                  lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(not_modified.status_code, 304)
+        self.product.tags.add('новый-тег')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_seller_products(self):
+        url = reverse('api_seller_products', args=[self.seller.username])
+        response = self.bench('api seller products', 2, lambda: self.client.get(url, HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(self.client.get(reverse('api_seller_products', args=['nobody'])).status_code, 404)
+
+    def test_serialization_throughput(self):
+        from .api import DETAIL_FIELDS, JSON_PARAMS, product_queryset, serialize_products
+
+        products = list(product_queryset(DETAIL_FIELDS).prefetch_related('tags'))
+        timings = []
+        for _ in range(BENCHMARK_RUNS):
+            started = time.perf_counter()
+            json.dumps(serialize_products(products, DETAIL_FIELDS), **JSON_PARAMS)
+            timings.append((time.perf_counter() - started) * 1000)
+        self.results.append((f'serialize {len(products)} товаров', 0, timings))
+        sys.stderr.write(
+            f"\nсериализация: {len(products) / (percentile(timings, 50) / 1000):,.0f} товаров/с (p50)\n"
+        )
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Главная и условия
@@ -19,6 +19,12 @@ urlpatterns = [
     path('products/<int:product_id>/review/', views.add_review, name='add_review'),
 
 
+    # JSON API каталога (только чтение)
+    path('api/v1/products/', api.product_list, name='api_product_list'),
+    path('api/v1/products/<int:product_id>/', api.product_detail, name='api_product_detail'),
+    path('api/v1/sellers/<str:username>/', api.seller_products, name='api_seller_products'),
+
+
     # Корзина
     path('cart/add/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/', views.remove_from_cart, name='remove_from_cart'),
@@ -32,6 +38,7 @@ urlpatterns = [
     path('checkout/', views.checkout, name='checkout'),
     path('checkout/<int:order_id>/pay/', views.payment_view, name='payment'),
     path('checkout/<int:order_id>/result/', views.payment_result, name='payment_result'),
+    path('checkout/<int:order_id>/status/', views.payment_status, name='payment_status'),
 
     # Чек на скачивание
     path('order/<uuid:transaction_id>/receipt/', views.generate_receipt, name='generate_receipt'),
@@ -50,6 +57,8 @@ urlpatterns = [
     path('chats/<int:room_id>/messages/', views.chat_messages, name='chat_messages'),
     # Отправка нового сообщения (AJAX)
     path('chats/<int:room_id>/send/', views.send_message, name='send_message'),
+    # Поток новых сообщений (SSE, только под ASGI)
+    path('chats/<int:room_id>/stream/', views.chat_stream, name='chat_stream'),
     # Окно чата
     path('chats/<int:room_id>/', views.chat_room, name='chat_room'),
 
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, Value, When
+
+from .models import Product
+from .page_cache import bump_version
+
+# Просмотры товаров копятся в памяти процесса и записываются в БД одним
+# UPDATE ... SET views = views + n: раз в FLUSH_INTERVAL секунд фоновым
+# потоком процесса и сразу при накоплении FLUSH_THRESHOLD просмотров.
+# save() не вызывается, поэтому updated_at не меняется и одновременные
+# просмотры не перетирают друг друга. При остановке процесса теряется не
+# больше интервала просмотров — счётчик приблизительный.
+FLUSH_INTERVAL = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30)
+FLUSH_THRESHOLD = getattr(settings, 'VIEW_COUNTER_FLUSH_THRESHOLD', 500)
+# Считать повторный просмотр того же товара в рамках сессии только один раз
+DEDUPE_SESSION = getattr(settings, 'VIEW_COUNTER_DEDUPE_SESSION', False)
+SESSION_KEY = 'viewed_products'
+SESSION_MAX_IDS = 200
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+_flusher = None
+
+logger = logging.getLogger('floreal.view_counter')
+
+
+def _already_viewed(request, product_id):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    viewed = session.get(SESSION_KEY, [])
+    if product_id in viewed:
+        return True
+    session[SESSION_KEY] = (viewed + [product_id])[-SESSION_MAX_IDS:]
+    return False
+
+
+def record_view(request, product_id):
+    """
+    Регистрирует просмотр товара. Возвращает True, если просмотр засчитан.
+    """
+    if DEDUPE_SESSION and _already_viewed(request, product_id):
+        return False
+    with _lock:
+        _pending[product_id] += 1
+        due = (
+            sum(_pending.values()) >= FLUSH_THRESHOLD
+            or time.monotonic() - _last_flush >= FLUSH_INTERVAL
+        )
+    _start_flusher()
+    if due:
+        safe_flush()
+    return True
+
+
+def pending_views(product_id):
+    """Просмотры товара, ещё не записанные в БД."""
+    with _lock:
+        return _pending.get(product_id, 0)
+
+
+def flush():
+    """
+    Записывает накопленные просмотры одним UPDATE. Возвращает число товаров.
+    """
+    global _last_flush
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not batch:
+        return 0
+    try:
+        Product.objects.filter(pk__in=batch).update(views=F('views') + Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in batch.items()],
+            default=Value(0),
+        ))
+    except Exception:
+        # не теряем просмотры: вернём их в буфер до следующей попытки
+        with _lock:
+            _pending.update(batch)
+        raise
+    # порядок «популярных» мог измениться — сбрасываем только этот блок главной
+    # и популярные страницы каталога
+    bump_version('home_popular', 'catalog_popular')
+    return len(batch)
+
+
+def safe_flush():
+    """flush() для запроса и фонового потока: ошибка БД пишется в лог, просмотры остаются в буфере."""
+    try:
+        return flush()
+    except Exception:
+        logger.exception("Не удалось записать просмотры товаров, повторим позже")
+        return 0
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        safe_flush()
+        # у потока своё соединение; между записями оно не нужно
+        connection.close()
+
+
+def _start_flusher():
+    global _flusher
+    # VIEW_COUNTER_FLUSH_THREAD = False отключает поток (тесты пишут буфер сами)
+    if _flusher is not None or not getattr(settings, 'VIEW_COUNTER_FLUSH_THREAD', True):
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name='view-counter-flush', daemon=True)
+            _flusher.start()
@@ -1,16 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.http import FileResponse, JsonResponse, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from django.utils.http import http_date
 from django.views.decorators.http import require_POST
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.utils import timezone
 import json
 from django.db import transaction
 from django.db import IntegrityError
 from django.db import connection
-import random
-from django.db.models import Q
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 
 
 
@@ -20,8 +23,20 @@ from .models import (
     ChatRoom, Message, UserProfile, Review
 )
 from .forms import (
-    RegisterForm, LoginForm, ProfileForm, ProductForm, ReviewForm, FakePaymentForm
+    RegisterForm, LoginForm, ProfileForm, ProductForm, ReviewForm, FakePaymentForm,
+    CatalogFilterForm,
 )
+from .cart_cache import get_cart_summary, invalidate_cart_summary
+from .view_counter import record_view, pending_views
+from .search import search_products_page
+from .pagination import paginate_request
+from .facets import facet_links, selected_tags
+from .catalog import catalog_facets, catalog_page
+from .chat_broker import get_broker
+from .receipts import ensure_receipt
+from .orders import place_order
+from .payments import FINAL_STATUSES, enqueue_payment
+from .page_cache import HOME_CACHE_TIMEOUT, cache_page_for_anonymous, get_version
 
 # --- Аутентификация и профиль ---
 
@@ -67,8 +82,14 @@ def logout_view(request):
 @login_required
 def profile_view(request):
     profile, _ = UserProfile.objects.get_or_create(user=request.user)
-    my_products = Product.objects.filter(seller=request.user).order_by('-created_at')
-    my_orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    my_products = paginate_request(
+        request, Product.objects.filter(seller=request.user), 'created_at',
+        param='products_cursor',
+    )
+    my_orders = paginate_request(
+        request, Order.objects.filter(user=request.user), 'created_at',
+        param='orders_cursor',
+    )
 
     if request.method == 'POST':
         form = ProfileForm(request.POST, instance=profile)
@@ -88,7 +109,9 @@ def profile_view(request):
 
 def public_profile(request, username):
     user_obj = get_object_or_404(User, username=username)
-    products = user_obj.products.filter(is_active=True).order_by('-created_at')
+    products = paginate_request(request, user_obj.products.filter(is_active=True), 'created_at')
+    if request.GET.get('format') == 'json':
+        return product_page_json(request, products)
     return render(request, 'profile/public_profile.html', {
         'profile_user': user_obj,
         'products': products,
@@ -120,21 +143,17 @@ def add_review(request, product_id):
 
 # --- Главная и условия ---
 
+@cache_page_for_anonymous('home_popular', 'home_new')
 def home(request):
-    with connection.cursor() as cursor:
-        cursor.execute("""
-            SELECT id, title, price, views
-              FROM app_of_floreal_paris_product
-             WHERE is_active = TRUE
-             ORDER BY views DESC
-             LIMIT 4
-        """)
-        rows = cursor.fetchall()
-    popular_products = Product.objects.order_by('-views')[:4]
-    new_products = Product.objects.order_by('-created_at')[:4]
+    # запросы ленивые: при попадании во фрагментный кэш шаблона они не выполняются
+    popular_products = Product.objects.filter(is_active=True).order_by('-views')[:4]
+    new_products = Product.objects.filter(is_active=True).order_by('-created_at')[:4]
     return render(request, 'base/home.html', {
         'popular_products': popular_products,
-        'new_products': new_products
+        'new_products': new_products,
+        'popular_version': get_version('home_popular'),
+        'new_version': get_version('home_new'),
+        'cache_timeout': HOME_CACHE_TIMEOUT,
     })
 
 
@@ -143,16 +162,53 @@ def terms_view(request):
 
 # --- Товары ---
 
+def product_page_json(request, page):
+    """
+    Страница товаров в JSON для бесконечной прокрутки.
+    """
+    return JsonResponse({
+        'products': [{
+            'id': p.id,
+            'title': p.title,
+            'price': str(p.price),
+            'image': p.image_640.url if p.image else None,
+            'url': reverse('product_detail', args=[p.id]),
+        } for p in page],
+        'next': page.next_url,
+    })
+
+
 def product_list(request):
-    products = Product.objects.filter(is_active=True).order_by('-created_at')
-    return render(request, 'products/product_list.html', {'products': products})
+    form = CatalogFilterForm(request.GET)
+    form.is_valid()  # невалидные поля просто не применяются, ошибки видны в форме
+    tags = selected_tags(request)
+    products = catalog_page(request, form, tags)
+    if request.GET.get('format') == 'json':
+        return product_page_json(request, products)
+    return render(request, 'products/product_list.html', {
+        'products': products,
+        'filter_form': form,
+        'facets': facet_links(request, catalog_facets(form, tags), tags),
+        'selected_tags': tags,
+    })
+
+
+REVIEWS_PAGE_SIZE = 10
 
 
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id, is_active=True)
-    product.views += 1
-    product.save()
-    return render(request, 'products/product_detail.html', {'product': product})
+    product = get_object_or_404(Product.objects.select_related('seller'), id=product_id, is_active=True)
+    # счётчик копится в буфере и пишется в БД пачками (см. view_counter.py)
+    record_view(request, product.id)
+    product.views += pending_views(product.id)
+    reviews = paginate_request(
+        request, product.reviews.select_related('user'), 'created_at',
+        param='reviews_cursor', per_page=REVIEWS_PAGE_SIZE,
+    )
+    return render(request, 'products/product_detail.html', {
+        'product': product,
+        'reviews': reviews,
+    })
 
 @login_required
 def add_product(request):
@@ -173,7 +229,9 @@ def add_product(request):
 
 @login_required
 def my_products(request):
-    products = Product.objects.filter(seller=request.user)
+    products = paginate_request(request, Product.objects.filter(seller=request.user), 'created_at')
+    if request.GET.get('format') == 'json':
+        return product_page_json(request, products)
     return render(request, 'products/product_list.html', {'products': products, 'mine': True})
 
 @login_required
@@ -184,7 +242,13 @@ def edit_product(request, product_id):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            form.save()
+            product = form.save(commit=False)
+            # только поля формы: полный UPDATE вернул бы прочитанные в начале
+            # запроса views и rating_*, затерев параллельные приращения через F()
+            product.save(update_fields=[
+                field.name for field in Product._meta.concrete_fields if field.name in form.Meta.fields
+            ] + ['updated_at'])
+            form.save_m2m()
             messages.success(request, "Товар обновлён")
             return redirect('product_detail', product_id=product.id)
     else:
@@ -204,38 +268,22 @@ def delete_product(request, product_id):
 
 def search_view(request):
     query = request.GET.get('q', '').strip()
-    product_results = []
+    product_results = None
     user_results = []
 
     if query:
-        # --- Поиск товаров через SQL-шаблон ---
-        sql_products = """
-            SELECT id, title, description, price, image, views
-            FROM app_of_floreal_paris_product
-            WHERE title ILIKE %s OR description ILIKE %s
-            ORDER BY views DESC
-        """
-        pattern = f'%{query}%'
-        with connection.cursor() as cursor:
-            cursor.execute(sql_products, [pattern, pattern])
-            rows = cursor.fetchall()
-        for id, title, description, price, image, views in rows:
-            product_results.append({
-                'id': id,
-                'title': title,
-                'description': description,
-                'price': price,
-                'image': image,
-                'views': views,
-            })
+        # --- Поиск товаров: полнотекстовый индекс + триграммы (см. search.py) ---
+        product_results = search_products_page(query, request.GET.get('page'))
 
         # --- Поиск пользователей через SQL-шаблон ---
         # Таблица пользователей — app_of_floreal_paris_user
+        pattern = f'%{query}%'
         sql_users = """
             SELECT id, username, email, date_joined
             FROM app_of_floreal_paris_user
             WHERE username ILIKE %s OR email ILIKE %s
             ORDER BY date_joined DESC
+            LIMIT 20
         """
         with connection.cursor() as cursor:
             cursor.execute(sql_users, [pattern, pattern])
@@ -259,7 +307,12 @@ def search_view(request):
 def get_active_cart(user):
     cart = Cart.objects.filter(user=user, is_active=True).first()
     if not cart:
-        cart = Cart.objects.create(user=user)
+        try:
+            with transaction.atomic():
+                cart = Cart.objects.create(user=user)
+        except IntegrityError:
+            # параллельный запрос уже создал активную корзину (cart_one_active_per_user)
+            cart = Cart.objects.get(user=user, is_active=True)
     return cart
 
 
@@ -267,21 +320,20 @@ def get_active_cart(user):
 @login_required
 def view_cart(request):
     cart = get_active_cart(request.user)
-    items = list(cart.items.select_related('product'))
-    # проверяем, что каждый product ещё существует
-    removed = []
-    for item in items:
-        if not Product.objects.filter(pk=item.product_id).exists():
-            removed.append(item.product.title)
-            item.delete()
+    items = list(cart.items.select_related('product').order_by('id'))
+    # удалённые товары уходят из корзины каскадом, а снятые с продажи
+    # убираем здесь — товар уже загружен, лишних запросов нет
+    removed = [item for item in items if not item.product.is_active]
     if removed:
-        # одно уведомление со всеми удалёнными ((НЕ РАБОТАЕТ!!!))
+        CartItem.objects.filter(pk__in=[item.pk for item in removed]).delete()
+        invalidate_cart_summary(request.user.pk)
+        # одно уведомление со всеми удалёнными
         messages.warning(
             request,
             "Эти товары были удалены продавцом и убраны из вашей корзины: "
-            + ", ".join(removed)
+            + ", ".join(item.product.title for item in removed)
         )
-        items = list(cart.items.select_related('product'))
+        items = [item for item in items if item.product.is_active]
 
     return render(request, 'cart/view_cart.html', {
         'cart': cart,
@@ -301,17 +353,18 @@ def add_to_cart(request):
     cart = get_active_cart(request.user)
     product = get_object_or_404(Product, id=product_id, is_active=True)
 
-    item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-    if created:
-        item.quantity = quantity
-    else:
-        item.quantity += quantity
-    item.save()
+    item, created = CartItem.objects.get_or_create(
+        cart=cart, product=product, defaults={'quantity': quantity}
+    )
+    if not created:
+        item.quantity = F('quantity') + quantity
+        item.save(update_fields=['quantity'])
 
+    summary = get_cart_summary(request.user.pk)
     return JsonResponse({
         'success': True,
-        'cart_count': cart.total_items(),
-        'cart_total': str(cart.total_price())
+        'cart_count': summary['cart_count'],
+        'cart_total': str(summary['cart_total'])
     })
 
 
@@ -335,8 +388,9 @@ def update_cart_item(request):
             item.delete()
 
     # пересчитываем
-    count = cart.total_items()
-    total = cart.total_price()
+    summary = get_cart_summary(request.user.pk)
+    count = summary['cart_count']
+    total = summary['cart_total']
     # если после декремента удалился, то qty = 0
     try:
         qty = CartItem.objects.get(cart=cart, product_id=pid).quantity
@@ -363,10 +417,11 @@ def remove_from_cart(request):
     # Удаляем элемент(ы)
     CartItem.objects.filter(cart=cart, product_id=product_id).delete()
 
+    summary = get_cart_summary(request.user.pk)
     return JsonResponse({
         'success': True,
-        'cart_count': cart.total_items(),
-        'cart_total': str(cart.total_price())
+        'cart_count': summary['cart_count'],
+        'cart_total': str(summary['cart_total'])
     })
 
 @require_POST
@@ -404,30 +459,19 @@ def clear_cart(request):
 
 @login_required
 def checkout(request):
-    cart = get_active_cart(request.user)
-    if cart.total_items() == 0:
+    order, _ = place_order(request.user)
+    if order is None:
         messages.error(request, "Корзина пуста.")
         return redirect('product_list')
 
-    # Создаём заказ
-    order = Order.objects.create(
-        user=request.user,
-        cart=cart,
-        total_amount=cart.total_price(),
-        created_at=timezone.now()
-    )
-    order.generate_signature()
-
-    # Деактивируем корзину, чтобы не создать по ней ещё раз
-    cart.is_active = False
-    cart.save()
-
-    # Перенаправляем на страницу «оплаты»
+    # Перенаправляем на страницу «оплаты» (для повторного запроса — того же заказа)
     return redirect('payment', order_id=order.id)
 
 @login_required
 def payment_view(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
+    if order.status == 'processing':
+        return redirect('payment_result', order_id=order.id)
     if order.status != 'pending':
         messages.error(request, "Этот заказ уже оплачен или отменён.")
         return redirect('profile')
@@ -435,13 +479,9 @@ def payment_view(request, order_id):
     if request.method == 'POST':
         form = FakePaymentForm(request.POST)
         if form.is_valid():
-            # эмулируем отправку на шлюз
-            order.status = 'processing'
-            order.save(update_fields=['status'])
-            # через момент «решаем» случайно успех/отказ (а чё поделать, реальной оплаты то нет)
-            success = random.random() < 0.8  # 80% вероятность успеха
-            order.status = 'completed' if success else 'cancelled'
-            order.save(update_fields=['status'])
+            # шлюз отвечает секундами — платёж проводит фоновый обработчик
+            # (payments.py, process_payments), а страница результата ждёт статус
+            enqueue_payment(order)
             return redirect('payment_result', order_id=order.id)
     else:
         form = FakePaymentForm()
@@ -454,30 +494,43 @@ def payment_view(request, order_id):
 @login_required
 def payment_result(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
-    # показываем страницу с итоговым статусом
+    # показываем страницу с итоговым статусом; пока платёж в обработке, она опрашивает payment_status
     return render(request, 'checkout/result.html', {
         'order': order
     })
 
+@login_required
+def payment_status(request, order_id):
+    status = get_object_or_404(
+        Order.objects.values_list('status', flat=True), id=order_id, user=request.user,
+    )
+    return JsonResponse({'status': status, 'final': status in FINAL_STATUSES})
+
 
 @login_required
 def generate_receipt(request, transaction_id):
     # Ищем заказ именно по UUID‑полю transaction_id
     order = get_object_or_404(
-        Order,
+        Order.objects.select_related('user'),
         transaction_id=transaction_id,
         user=request.user
     )
-    html = f"""
-    <html><head><title>Чек #{order.transaction_id}</title></head><body>
-    <h1>Чек #{order.transaction_id}</h1>
-    <p>Сумма: {order.total_amount} руб.</p>
-    </body></html>
-    """
-    response = HttpResponse(html, content_type='text/html')
-    response['Content-Disposition'] = (
-        f'attachment; filename="receipt_{order.transaction_id}.html"'
+    # содержимое чека неизменно, поэтому ETag — это сам transaction_id
+    etag = f'"receipt-{order.transaction_id}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    name, _ = ensure_receipt(order)
+    response = FileResponse(
+        default_storage.open(name, 'rb'),
+        as_attachment=True,
+        filename=f'receipt_{order.transaction_id}.pdf',
+        content_type='application/pdf',
     )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(default_storage.get_modified_time(name).timestamp())
+    response['Cache-Control'] = 'private, max-age=86400'
     return response
 
 # --- Чат --- (вырезано)
@@ -489,7 +542,7 @@ def delete_review(request, review_id):
     if request.user.role != 'admin':
         return HttpResponseForbidden("Только администратор может удалять отзывы.")
     review = get_object_or_404(Review, id=review_id)
-    product_id = review.product.id
+    product_id = review.product_id
     review.delete()
     messages.success(request, "Отзыв успешно удалён.")
     return redirect('product_detail', product_id=product_id)
@@ -517,37 +570,95 @@ def delete_user(request, username):
 
 @login_required
 def chat_list(request):
-    # все комнаты, где я — либо buyer, либо seller
+    # все комнаты, где я — либо buyer, либо seller; последнее сообщение и
+    # число непрочитанных считаются подзапросами, так что запросов всегда один
+    last_message = Message.objects.filter(chat_room=OuterRef('pk')).order_by('-id')
+    unread = Message.objects.filter(
+        chat_room=OuterRef('pk'), read=False
+    ).exclude(sender=request.user).values('chat_room').annotate(n=Count('id')).values('n')
     rooms = ChatRoom.objects.filter(
         Q(buyer=request.user) | Q(seller=request.user)
+    ).select_related('product', 'buyer', 'seller').annotate(
+        last_message_content=Subquery(last_message.values('content')[:1]),
+        last_message_sender=Subquery(last_message.values('sender__username')[:1]),
+        last_message_at=Subquery(last_message.values('timestamp')[:1]),
+        unread_count=Coalesce(Subquery(unread), 0),
     ).order_by('-updated_at')
     return render(request, 'chat/chat_list.html', {'rooms': rooms})
 
+
+def mark_room_read(room, user, after_id=None):
+    """
+    Помечает прочитанными все чужие сообщения комнаты одним UPDATE.
+    """
+    unread = room.messages.filter(read=False).exclude(sender=user)
+    if after_id is not None:
+        unread = unread.filter(id__gt=after_id)
+    return unread.update(read=True)
+
+
 @login_required
 def chat_room(request, room_id):
-    room = get_object_or_404(ChatRoom, id=room_id)
-    if request.user not in (room.buyer, room.seller):
+    room = get_object_or_404(ChatRoom.objects.select_related('product'), id=room_id)
+    if request.user.id not in (room.buyer_id, room.seller_id):
         return HttpResponseForbidden()
+    mark_room_read(room, request.user)
     return render(request, 'chat/chat_room.html', {'room': room})
 
+CHAT_HISTORY_PAGE = 50
+
+
+def message_json(msg):
+    return {
+        'id': msg.id,
+        'sender': msg.sender.username,
+        'content': msg.content,
+        'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
 @login_required
 def chat_messages(request, room_id):
     """
-    Возвращает JSON со всеми сообщениями в комнате.
+    Возвращает JSON с сообщениями комнаты:
+      ?since=<id>  — только новые сообщения после id (для опроса);
+      ?before=<id> — предыдущая порция истории перед id;
+      без параметров — последние CHAT_HISTORY_PAGE сообщений.
+    При неизменившейся комнате отвечает 304 по ETag.
     """
     room = get_object_or_404(ChatRoom, id=room_id)
-    if request.user not in (room.buyer, room.seller):
+    if request.user.id not in (room.buyer_id, room.seller_id):
         return JsonResponse({'error': 'Forbidden'}, status=403)
 
-    data = []
-    for msg in room.messages.order_by('timestamp'):
-        data.append({
-            'id': msg.id,
-            'sender': msg.sender.username,
-            'content': msg.content,
-            'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-        })
-    return JsonResponse({'messages': data})
+    since = request.GET.get('since', '')
+    before = request.GET.get('before', '')
+    last_id = room.messages.order_by('-id').values_list('id', flat=True).first() or 0
+    etag = f'"chat-{room.id}-{last_id}-{since}-{before}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    messages_qs = room.messages.select_related('sender')
+    has_more = False
+    if since.isdigit():
+        batch = list(messages_qs.filter(id__gt=int(since)).order_by('id'))
+        # собеседник открыт в чате — новые сообщения сразу становятся прочитанными
+        if any(not msg.read and msg.sender_id != request.user.id for msg in batch):
+            mark_room_read(room, request.user, after_id=int(since))
+    else:
+        if before.isdigit():
+            messages_qs = messages_qs.filter(id__lt=int(before))
+        batch = list(messages_qs.order_by('-id')[:CHAT_HISTORY_PAGE + 1])
+        has_more = len(batch) > CHAT_HISTORY_PAGE
+        batch = batch[:CHAT_HISTORY_PAGE][::-1]
+
+    response = JsonResponse({
+        'messages': [message_json(msg) for msg in batch],
+        'last_id': last_id,
+        'has_more': has_more,
+    })
+    response['ETag'] = etag
+    return response
 
 @login_required
 def send_message(request, room_id):
@@ -555,7 +666,7 @@ def send_message(request, room_id):
     Принимает POST { content: "...", attachment: file? }
     """
     room = get_object_or_404(ChatRoom, id=room_id)
-    if request.user not in (room.buyer, room.seller):
+    if request.user.id not in (room.buyer_id, room.seller_id):
         return JsonResponse({'error': 'Forbidden'}, status=403)
 
     if request.method != 'POST':
@@ -573,12 +684,59 @@ def send_message(request, room_id):
     # Обновим updated_at у комнаты, чтобы сортировка в списке работала
     room.save()
 
-    return JsonResponse({
-        'id': msg.id,
-        'sender': msg.sender.username,
-        'content': msg.content,
-        'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-    })
+    payload = message_json(msg)
+    # подписчики SSE-потока комнаты получат сообщение сразу после коммита
+    transaction.on_commit(lambda: get_broker().publish(room.id, payload))
+    return JsonResponse(payload)
+
+
+# Пауза между keep-alive комментариями SSE-потока, секунд
+CHAT_STREAM_HEARTBEAT = 15
+
+
+async def _chat_events(room_id, last_event_id):
+    async with get_broker().subscribe(room_id) as subscription:
+        yield 'retry: 3000\n\n'
+        # после переподключения досылаем пропущенное (Last-Event-ID)
+        if last_event_id.isdigit():
+            missed = Message.objects.filter(
+                chat_room_id=room_id, id__gt=int(last_event_id)
+            ).select_related('sender').order_by('id')
+            async for msg in missed:
+                yield _sse(message_json(msg))
+        while True:
+            payload = await subscription.get(CHAT_STREAM_HEARTBEAT)
+            yield ': ping\n\n' if payload is None else _sse(payload)
+
+
+def _sse(payload):
+    return f"id: {payload['id']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@login_required
+async def chat_stream(request, room_id):
+    """
+    Server-Sent Events: новые сообщения комнаты по мере отправки.
+    Работает при запуске через ASGI (manager_of_floreal_paris.asgi).
+    """
+    if 'wsgi.version' in request.META:
+        # под WSGI бесконечный поток занял бы воркер; 204 останавливает
+        # EventSource, и страница чата остаётся на опросе chat_messages
+        return HttpResponse(status=204)
+    user = await request.auser()
+    room = await ChatRoom.objects.filter(id=room_id).afirst()
+    if room is None:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    if user.id not in (room.buyer_id, room.seller_id):
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    response = StreamingHttpResponse(
+        _chat_events(room.id, request.headers.get('Last-Event-ID', '')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @login_required
 def start_chat(request, product_id):
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.models import DailySales, ProductSales, SellerSales
+from dashboard.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает сводные таблицы продаж (по дням, продавцам и товарам) по всем "
+        "заказам. Нужна после массовой загрузки заказов в обход save() (seed_marketplace, "
+        "COPY) или если сводки разошлись с заказами."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.monotonic() - started:.1f} с: дней {DailySales.objects.count()}, "
+            f"продавцов {SellerSales.objects.count()}, товаров {ProductSales.objects.count()}"
+        ))
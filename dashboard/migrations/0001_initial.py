@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2025-07-19 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('app_of_floreal_paris', '0007_product_active_price_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='День')),
+                ('orders', models.IntegerField(default=0, verbose_name='Оформлено заказов')),
+                ('completed', models.IntegerField(default=0, verbose_name='Завершено')),
+                ('cancelled', models.IntegerField(default=0, verbose_name='Отменено')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('items_sold', models.IntegerField(default=0, verbose_name='Продано штук')),
+            ],
+            options={
+                'verbose_name': 'Продажи за день',
+                'verbose_name_plural': 'Продажи по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('items_sold', models.IntegerField(default=0, verbose_name='Продано штук')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='app_of_floreal_paris.product')),
+            ],
+            options={
+                'verbose_name': 'Продажи товара',
+                'verbose_name_plural': 'Продажи по товарам',
+                'indexes': [models.Index(fields=['-revenue'], name='productsales_revenue_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SellerSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('items_sold', models.IntegerField(default=0, verbose_name='Продано штук')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Продажи продавца',
+                'verbose_name_plural': 'Продажи по продавцам',
+                'indexes': [models.Index(fields=['-revenue'], name='sellersales_revenue_idx')],
+            },
+        ),
+    ]
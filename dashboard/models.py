@@ -1,3 +1,56 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from app_of_floreal_paris.models import Product
+
+# Сводные таблицы продаж для страницы аналитики. Обновляются приращениями
+# при смене статуса заказа (dashboard/signals.py, rollups.py), а целиком
+# пересчитываются командой rebuild_sales_rollups. Выручка и проданные
+# штуки учитываются только по завершённым заказам, день — дата оформления.
+
+
+class DailySales(models.Model):
+    date = models.DateField(unique=True, verbose_name="День")
+    orders = models.IntegerField(default=0, verbose_name="Оформлено заказов")
+    completed = models.IntegerField(default=0, verbose_name="Завершено")
+    cancelled = models.IntegerField(default=0, verbose_name="Отменено")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Выручка")
+    items_sold = models.IntegerField(default=0, verbose_name="Продано штук")
+
+    class Meta:
+        verbose_name = "Продажи за день"
+        verbose_name_plural = "Продажи по дням"
+
+    def __str__(self):
+        return f"{self.date}: {self.revenue}"
+
+
+class SellerSales(models.Model):
+    seller = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                  related_name='sales')
+    orders = models.IntegerField(default=0, verbose_name="Заказов")
+    items_sold = models.IntegerField(default=0, verbose_name="Продано штук")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Выручка")
+
+    class Meta:
+        verbose_name = "Продажи продавца"
+        verbose_name_plural = "Продажи по продавцам"
+        indexes = [models.Index(fields=['-revenue'], name='sellersales_revenue_idx')]
+
+    def __str__(self):
+        return f"{self.seller_id}: {self.revenue}"
+
+
+class ProductSales(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='sales')
+    orders = models.IntegerField(default=0, verbose_name="Заказов")
+    items_sold = models.IntegerField(default=0, verbose_name="Продано штук")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Выручка")
+
+    class Meta:
+        verbose_name = "Продажи товара"
+        verbose_name_plural = "Продажи по товарам"
+        indexes = [models.Index(fields=['-revenue'], name='productsales_revenue_idx')]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.revenue}"
@@ -0,0 +1,183 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from taggit.models import TaggedItem
+
+from app_of_floreal_paris.cart_cache import invalidate_cart_summary
+from app_of_floreal_paris.models import (
+    CartItem, ChatRoom, Message, OrderItem, Product, Report, Review, User,
+)
+from app_of_floreal_paris.page_cache import bump_version
+from app_of_floreal_paris.ratings import recompute_ratings
+
+from .models import ProductSales
+from .rollups import remove_products
+
+# Массовые действия модерации. Каждое — несколько запросов над множеством id
+# в одной транзакции, независимо от числа выбранных строк. Обычный delete()
+# выбрал бы все строки и послал сигналы по каждой (пересчёт рейтинга на
+# каждый отзыв, сброс кэша на каждую позицию корзины), поэтому зависимые
+# таблицы чистятся напрямую, а побочные эффекты сигналов выполняются один раз.
+PRODUCT_ACTIONS = ('delete', 'deactivate', 'restore')
+REVIEW_ACTIONS = ('delete',)
+USER_ACTIONS = ('make_admin', 'revoke_admin')
+REPORT_ACTIONS = ('resolve', 'reject', 'release')
+
+REPORT_BATCH = getattr(settings, 'DASHBOARD_REPORT_BATCH', 20)
+REPORT_CLAIM_TTL = getattr(settings, 'DASHBOARD_REPORT_CLAIM_TTL', timedelta(minutes=30))
+
+# связи, которые delete_products обрабатывает сам; новая ссылка на Product
+# должна попасть сюда (это проверяет тест)
+PRODUCT_RELATIONS = {
+    (CartItem, 'product'), (ChatRoom, 'product'), (Report, 'reported_product'),
+    (Review, 'product'), (OrderItem, 'product'), (ProductSales, 'product'),
+}
+
+
+def _raw_delete(queryset):
+    # один DELETE ... WHERE без выборки строк и без сигналов — так Django сам
+    # удаляет «быстрые» каскады
+    return queryset._raw_delete(queryset.db)
+
+
+def _cart_users(product_ids):
+    return list(
+        CartItem.objects.filter(product__in=product_ids, cart__is_active=True)
+        .values_list('cart__user_id', flat=True).distinct()
+    )
+
+
+def _after_products_changed(cart_users):
+    invalidate_cart_summary(*cart_users)
+    bump_version('home_popular', 'home_new', 'catalog')
+
+
+def delete_products(ids):
+    with transaction.atomic():
+        found = list(Product.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if not found:
+            return {'affected': 0}
+        cart_users = _cart_users(found)
+        _raw_delete(CartItem.objects.filter(product__in=found))
+        _raw_delete(Message.objects.filter(chat_room__product__in=found))
+        _raw_delete(ChatRoom.objects.filter(product__in=found))
+        _raw_delete(Report.objects.filter(reported_product__in=found))
+        reviews = _raw_delete(Review.objects.filter(product__in=found))
+        # заказы хранят снимок позиции, ссылка на товар просто обнуляется;
+        # продажи товаров уходят из сводок продавцов, как при полном пересчёте
+        remove_products(found)
+        OrderItem.objects.filter(product__in=found).update(product=None)
+        _raw_delete(ProductSales.objects.filter(product__in=found))
+        _raw_delete(TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Product), object_id__in=found,
+        ))
+        affected = _raw_delete(Product.objects.filter(pk__in=found))
+    _after_products_changed(cart_users)
+    return {'affected': affected, 'reviews_deleted': reviews}
+
+
+def set_products_active(ids, active):
+    with transaction.atomic():
+        affected = Product.objects.filter(pk__in=ids, is_active=not active).update(
+            is_active=active, updated_at=timezone.now(),
+        )
+        cart_users = _cart_users(ids) if affected else []
+    if affected:
+        _after_products_changed(cart_users)
+    return {'affected': affected}
+
+
+def delete_reviews(ids):
+    with transaction.atomic():
+        reviews = Review.objects.filter(pk__in=ids)
+        product_ids = set(reviews.values_list('product_id', flat=True))
+        affected = _raw_delete(reviews)
+        # рейтинги затронутых товаров пересчитываются двумя UPDATE на всех сразу
+        if product_ids:
+            recompute_ratings(Product.objects.filter(pk__in=product_ids))
+    if affected:
+        bump_version('catalog_rating')
+    return {'affected': affected, 'products_updated': len(product_ids)}
+
+
+def set_users_role(ids, role, acting_user):
+    users = User.objects.filter(pk__in=ids, is_superuser=False).exclude(pk=acting_user.pk)
+    if role == 'admin':
+        users = users.exclude(role='admin')
+    else:
+        users = users.filter(role='admin')
+    return {'affected': users.update(role=role)}
+
+
+# Очередь жалоб. Модератор забирает пачку самых старых свободных жалоб:
+# SELECT ... FOR UPDATE SKIP LOCKED пропускает строки, которые прямо сейчас
+# забирает другой модератор, поэтому параллельные захваты не ждут друг друга
+# и не получают одних и тех же жалоб. Блокировка живёт до конца транзакции,
+# а сам захват — до истечения REPORT_CLAIM_TTL (claimed_by, claimed_at).
+
+def _claim_expired():
+    return timezone.now() - REPORT_CLAIM_TTL
+
+
+def claimed_reports(moderator):
+    """Жалобы на рассмотрении, захваченные модератором и ещё не истёкшие."""
+    return Report.objects.filter(status='pending', claimed_by=moderator, claimed_at__gt=_claim_expired())
+
+
+def claim_reports(moderator, limit=REPORT_BATCH):
+    """
+    Добирает захваченные модератором жалобы до limit самыми старыми
+    свободными и продлевает захват; возвращает число новых.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        held = claimed_reports(moderator)
+        needed = limit - held.count()
+        free = []
+        if needed > 0:
+            free = list(
+                Report.objects.filter(status='pending')
+                .filter(Q(claimed_by__isnull=True) | Q(claimed_at__lte=now - REPORT_CLAIM_TTL))
+                .order_by('created_at', 'pk')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:needed]
+            )
+        Report.objects.filter(Q(pk__in=free) | Q(pk__in=held.values('pk'))).update(
+            claimed_by=moderator, claimed_at=now,
+        )
+    return len(free)
+
+
+def close_reports(ids, status, moderator, notes=''):
+    # закрыть можно свою или ничью жалобу, но не ту, что в работе у другого
+    reports = Report.objects.filter(pk__in=ids, status='pending').filter(
+        Q(claimed_by=moderator) | Q(claimed_by__isnull=True) | Q(claimed_at__lte=_claim_expired())
+    )
+    return {'affected': reports.update(
+        status=status, resolved_by=moderator, resolved_at=timezone.now(),
+        resolution_notes=notes, claimed_by=None, claimed_at=None,
+    )}
+
+
+def release_reports(ids, moderator):
+    reports = Report.objects.filter(pk__in=ids, status='pending', claimed_by=moderator)
+    return {'affected': reports.update(claimed_by=None, claimed_at=None)}
+
+
+def run(kind, action, ids, acting_user, notes=''):
+    """Выполняет действие action над объектами kind; возвращает словарь-сводку."""
+    if kind == 'reports':
+        if action == 'release':
+            return release_reports(ids, acting_user)
+        return close_reports(ids, 'resolved' if action == 'resolve' else 'rejected', acting_user, notes)
+    if kind == 'products':
+        if action == 'delete':
+            return delete_products(ids)
+        return set_products_active(ids, active=(action == 'restore'))
+    if kind == 'reviews':
+        return delete_reviews(ids)
+    return set_users_role(ids, 'admin' if action == 'make_admin' else 'buyer', acting_user)
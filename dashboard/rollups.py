@@ -0,0 +1,196 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, DecimalField, Exists, ExpressionWrapper, F, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from app_of_floreal_paris.models import Order, OrderItem
+
+from .models import DailySales, ProductSales, SellerSales
+
+# Приращения сводных таблиц. Переход заказа old -> new (None — заказа нет:
+# только что создан или удаляется) превращается в набор дельт для строки дня,
+# продавцов и товаров и применяется одним upsert (f = f + delta) на строку
+# в той же транзакции, что и сохранение заказа. Строки блокируются в порядке ключей,
+# поэтому параллельные заказы одних и тех же продавцов не дают взаимоблокировок.
+COUNTED_STATUSES = ('completed', 'cancelled')
+ZERO = Decimal('0')
+REBUILD_CHUNK = 5000
+
+
+def _upsert(model, key, deltas):
+    # INSERT ... ON CONFLICT DO UPDATE: один запрос и для новой строки, и для существующей
+    # у полей только питоновский default, поэтому в INSERT перечисляются все счётчики
+    meta = model._meta
+    counters = [f.name for f in meta.concrete_fields if not f.primary_key and f.attname not in key]
+    key_columns = [meta.get_field(name).column for name in key]
+    columns = key_columns + [meta.get_field(name).column for name in counters]
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    sql = (
+        f"INSERT INTO {table} ({', '.join(map(quote, columns))}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(map(quote, key_columns))}) DO UPDATE SET "
+        + ', '.join(f"{quote(c)} = {table}.{quote(c)} + EXCLUDED.{quote(c)}" for c in columns[len(key):])
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*key.values(), *(deltas.get(name, 0) for name in counters)])
+
+
+def _bump(model, key, deltas):
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    if connection.vendor == 'postgresql':
+        return _upsert(model, key, deltas)
+    update = {name: F(name) + value for name, value in deltas.items()}
+    if model.objects.filter(**key).update(**update):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **deltas)
+    except IntegrityError:
+        # строку только что создал параллельный заказ
+        model.objects.filter(**key).update(**update)
+
+
+def order_lines(order):
+    """(product_id, seller_id, price, quantity) строк заказа."""
+    return list(order.items.values_list('product_id', 'product__seller_id', 'price', 'quantity'))
+
+
+def apply_transition(order, old_status, new_status, lines=None):
+    if old_status == new_status:
+        return
+    daily = Counter()
+    if old_status is None:
+        daily['orders'] += 1
+    if new_status is None:
+        daily['orders'] -= 1
+    for status, sign in ((old_status, -1), (new_status, +1)):
+        if status in COUNTED_STATUSES:
+            daily[status] += sign
+
+    sign = (new_status == 'completed') - (old_status == 'completed')
+    sellers, products = defaultdict(Counter), defaultdict(Counter)
+    if sign:
+        lines = order_lines(order) if lines is None else lines
+        daily['revenue'] += sign * order.total_amount
+        seller_ids = set()
+        for product_id, seller_id, price, quantity in lines:
+            daily['items_sold'] += sign * quantity
+            if product_id is None:
+                continue
+            products[product_id]['items_sold'] += sign * quantity
+            products[product_id]['revenue'] += sign * price * quantity
+            products[product_id]['orders'] = sign
+            seller_ids.add(seller_id)
+            sellers[seller_id]['items_sold'] += sign * quantity
+            sellers[seller_id]['revenue'] += sign * price * quantity
+        for seller_id in seller_ids:
+            sellers[seller_id]['orders'] = sign
+
+    _bump(DailySales, {'date': timezone.localdate(order.created_at)}, daily)
+    for seller_id in sorted(sellers):
+        _bump(SellerSales, {'seller_id': seller_id}, sellers[seller_id])
+    for product_id in sorted(products):
+        _bump(ProductSales, {'product_id': product_id}, products[product_id])
+
+
+def remove_products(product_ids):
+    """
+    Вычитает продажи удаляемых товаров из сводок продавцов: полный пересчёт
+    не видит позиций, у которых ссылка на товар обнулена. Заказ вычитается
+    из счётчика продавца, только если других его товаров в заказе нет.
+    Вызывается до обнуления OrderItem.product; ProductSales удаляются вместе
+    с товарами.
+    """
+    others = OrderItem.objects.filter(
+        order=OuterRef('order'), product__seller=OuterRef('product__seller'),
+    ).exclude(product__in=product_ids)
+    rows = list(
+        OrderItem.objects.filter(order__status='completed', product__in=product_ids)
+        .values('product__seller').annotate(
+            orders=Count('order', distinct=True, filter=~Exists(others)),
+            items_sold=Sum('quantity'), revenue=_completed_revenue(),
+        ).order_by()
+    )
+    if not rows:
+        return
+    seller_ids = [row['product__seller'] for row in rows]
+    # строки блокируются в порядке ключей, как и в apply_transition
+    list(SellerSales.objects.filter(seller_id__in=seller_ids).order_by('seller_id')
+         .select_for_update().values_list('pk', flat=True))
+
+    def minus(name):
+        return F(name) - Case(
+            *[When(seller_id=row['product__seller'], then=Value(row[name])) for row in rows],
+            default=Value(0), output_field=SellerSales._meta.get_field(name),
+        )
+    SellerSales.objects.filter(seller_id__in=seller_ids).update(
+        orders=minus('orders'), items_sold=minus('items_sold'), revenue=minus('revenue'),
+    )
+
+
+def _completed_revenue():
+    return Coalesce(
+        Sum(ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))),
+        ZERO,
+    )
+
+
+def _bulk_insert(model, rows):
+    for start in range(0, len(rows), REBUILD_CHUNK):
+        model.objects.bulk_create(rows[start:start + REBUILD_CHUNK])
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """
+    Пересчитывает сводные таблицы по заказам целиком. Таблицы блокируются
+    на запись до конца транзакции: приращения от заказов, изменённых во время
+    пересчёта, дождутся его и лягут поверх новых значений.
+    """
+    tables = [model._meta.db_table for model in (DailySales, SellerSales, ProductSales)]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {', '.join(tables)} IN EXCLUSIVE MODE")
+    for model in (DailySales, SellerSales, ProductSales):
+        model.objects.all().delete()
+
+    completed = Q(status='completed')
+    days = {
+        row['day']: DailySales(
+            date=row['day'], orders=row['orders'], completed=row['completed'],
+            cancelled=row['cancelled'], revenue=row['revenue'],
+        )
+        for row in Order.objects.annotate(day=TruncDate('created_at')).values('day').annotate(
+            orders=Count('id'),
+            completed=Count('id', filter=completed),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            revenue=Coalesce(Sum('total_amount', filter=completed), ZERO),
+        ).order_by()
+    }
+    items = OrderItem.objects.filter(order__status='completed')
+    for row in (items.annotate(day=TruncDate('order__created_at')).values('day')
+                .annotate(n=Sum('quantity')).order_by()):
+        days[row['day']].items_sold = row['n']
+    _bulk_insert(DailySales, list(days.values()))
+
+    _bulk_insert(SellerSales, [
+        SellerSales(seller_id=row['product__seller'], orders=row['orders'],
+                    items_sold=row['items_sold'], revenue=row['revenue'])
+        for row in items.filter(product__isnull=False).values('product__seller').annotate(
+            orders=Count('order', distinct=True), items_sold=Sum('quantity'), revenue=_completed_revenue(),
+        ).order_by()
+    ])
+    _bulk_insert(ProductSales, [
+        ProductSales(product_id=row['product'], orders=row['orders'],
+                     items_sold=row['items_sold'], revenue=row['revenue'])
+        for row in items.filter(product__isnull=False).values('product').annotate(
+            orders=Count('order', distinct=True), items_sold=Sum('quantity'), revenue=_completed_revenue(),
+        ).order_by()
+    ])
+    return len(days)
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from app_of_floreal_paris.models import Order, Product
+
+from .rollups import apply_transition, order_lines, remove_products
+
+
+# --- Сводные таблицы продаж ---
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, update_fields=None, **kwargs):
+    # прежний статус берём из БД, а не из экземпляра: он мог устареть
+    if instance._state.adding or (update_fields is not None and 'status' not in update_fields):
+        return
+    instance._rollup_status = (
+        Order.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_transition(instance, None, instance.status)
+    elif hasattr(instance, '_rollup_status'):
+        apply_transition(instance, instance.__dict__.pop('_rollup_status'), instance.status)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_from_sales_rollups(sender, instance, **kwargs):
+    # строки заказа удаляются каскадом раньше post_delete — читаем их сейчас
+    lines = order_lines(instance) if instance.status == 'completed' else []
+    apply_transition(instance, instance.status, None, lines=lines)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_product_from_sales_rollups(sender, instance, **kwargs):
+    # позиции заказов потеряют ссылку на товар (SET_NULL) уже после сигнала
+    remove_products([instance.pk])
@@ -1,3 +1,286 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from taggit.models import TaggedItem
+
+from app_of_floreal_paris.tests import BenchmarkCase
+from app_of_floreal_paris.models import CartItem, Order, OrderItem, Product, Report, Review, User
+from app_of_floreal_paris.orders import place_order
+from app_of_floreal_paris.views import get_active_cart
+
+from . import moderation
+from .models import DailySales, ProductSales, SellerSales
+from .rollups import rebuild_rollups
+from .views import filter_orders
+
+
+class DashboardBenchmarks(BenchmarkCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('bench_admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+
+    def test_index(self):
+        self.bench('dashboard index', 3, lambda: self.client.get(reverse('dashboard:index')))
+
+    def test_user_list(self):
+        self.bench('dashboard user_list', 4, lambda: self.client.get(reverse('dashboard:user_list')))
+
+    def test_product_list(self):
+        url = reverse('dashboard:product_list')
+        self.bench('dashboard product_list', 4, lambda: self.client.get(url))
+        self.bench('dashboard product_list (поиск)', 5, lambda: self.client.get(url, {'q': 'розы'}))
+
+    def test_review_list(self):
+        self.bench('dashboard review_list', 4, lambda: self.client.get(reverse('dashboard:review_list')))
+
+    def test_export_orders(self):
+        url = reverse('dashboard:export_orders')
+        self.bench('dashboard export_orders', 3, lambda: self.client.get(url))
+
+    def test_export_orders_by_date(self):
+        order = Order.objects.order_by('id').first()
+        day = timezone.localdate(order.created_at).isoformat()
+        orders = filter_orders({'date_from': day, 'date_to': day})
+        self.assertIn(order, orders)
+        self.assertEqual(orders.count(), Order.objects.filter(
+            created_at__date=timezone.localdate(order.created_at)).count())
+        # диапазон по order_created_idx, без приведения created_at к дате
+        self.assertNotIn('::date', str(orders.query))
+        response = self.client.get(reverse('dashboard:export_orders'), {'date_from': day, 'date_to': day})
+        self.assertIn(str(order.transaction_id), b''.join(response.streaming_content).decode())
+
+    def test_analytics(self):
+        rebuild_rollups()
+        url = reverse('dashboard:analytics')
+        self.bench('dashboard analytics (30 дн.)', 6, lambda: self.client.get(url))
+        response = self.bench('dashboard analytics (365 дн.)', 6, lambda: self.client.get(url, {'days': 365}))
+        self.assertEqual(len(response.context['chart']), 365)
+
+    def test_rollups_match_rebuild(self):
+        # приращения от смены статусов и удаления заказов дают то же,
+        # что и полный пересчёт
+        rebuild_rollups()
+        orders = list(Order.objects.order_by('id')[:30])
+        for order, status in zip(orders, ['completed', 'cancelled', 'pending', 'processing'] * 10):
+            order.status = status
+            order.save(update_fields=['status'])
+        orders[0].delete()
+        orders[1].delete()
+
+        cart = get_active_cart(self.buyer)
+        cart.items.create(product=self.product, quantity=3)
+        order, _ = place_order(self.buyer)
+        order.status = 'completed'
+        order.save()
+
+        # удалённые товары выпадают из сводок продавцов — и массово, и по одному
+        sold = list(OrderItem.objects.filter(order__status='completed', product__isnull=False)
+                    .exclude(product=self.product).values_list('product', flat=True).distinct()[:3])
+        self.assertEqual(len(sold), 3)
+        moderation.delete_products(sold[:2])
+        Product.objects.get(pk=sold[2]).delete()
+
+        def snapshot():
+            return (
+                sorted(DailySales.objects.exclude(orders=0).values_list('date', 'orders', 'completed', 'cancelled',
+                                                      'revenue', 'items_sold')),
+                sorted(SellerSales.objects.exclude(orders=0).values_list('seller', 'orders', 'items_sold', 'revenue')),
+                sorted(ProductSales.objects.exclude(orders=0).values_list('product', 'orders', 'items_sold', 'revenue')),
+            )
+
+        incremental = snapshot()
+        rebuild_rollups()
+        self.assertEqual(incremental, snapshot())
+        self.assertEqual(ProductSales.objects.get(product=self.product).items_sold,
+                         sum(self.product.orderitem_set.filter(order__status='completed')
+                             .values_list('quantity', flat=True)))
+
+
+class BulkModerationBenchmarks(BenchmarkCase):
+    # число запросов не зависит от того, сколько строк выбрано
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('bench_admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+
+    def post(self, name, action, ids):
+        return self.client.post(reverse(f'dashboard:bulk_{name}'), json.dumps({'action': action, 'ids': ids}),
+                                content_type='application/json')
+
+    def test_product_relations_covered(self):
+        self.assertEqual(
+            {(rel.related_model, rel.field.name) for rel in Product._meta.related_objects},
+            moderation.PRODUCT_RELATIONS,
+        )
+
+    def test_bulk_products(self):
+        ids = list(Product.objects.values_list('pk', flat=True)[:60])
+        restore = lambda: Product.objects.filter(pk__in=ids).update(is_active=True)
+        self.bench('bulk deactivate (1 товар)', 6, lambda: self.post('products', 'deactivate', ids[:1]),
+                   setup=restore)
+        self.bench('bulk deactivate (60 товаров)', 6, lambda: self.post('products', 'deactivate', ids),
+                   setup=restore)
+        response = self.post('products', 'restore', ids)
+        self.assertEqual(response.json()['affected'], 60)
+        self.assertEqual(self.post('products', 'restore', ids).json()['affected'], 0)
+
+        cart = get_active_cart(self.buyer)
+        cart.items.create(product_id=ids[0], quantity=1)
+        self.assertTrue(OrderItem.objects.filter(product__in=ids).exists())
+        response = self.bench('bulk delete (60 товаров)', 18, lambda: self.post('products', 'delete', ids), runs=1)
+        self.assertEqual(response.json()['affected'], 60)
+        self.assertFalse(Product.objects.filter(pk__in=ids).exists())
+        self.assertFalse(Review.objects.filter(product__in=ids).exists())
+        self.assertFalse(CartItem.objects.filter(product__in=ids).exists())
+        self.assertFalse(TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Product), object_id__in=ids).exists())
+        # позиции заказов остаются без ссылки на товар
+        self.assertTrue(OrderItem.objects.filter(product__isnull=True).exists())
+
+    def test_bulk_reviews(self):
+        reviews = list(Review.objects.filter(product=self.product).values_list('pk', flat=True))
+        other = list(Review.objects.exclude(product=self.product).values_list('pk', flat=True)[:100])
+        response = self.bench('bulk delete (отзывы)', 8, lambda: self.post('reviews', 'delete', reviews + other),
+                              runs=1)
+        self.assertEqual(response.json()['affected'], len(reviews) + len(other))
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_count, self.product.rating_avg), (0, 0))
+        for product in Product.objects.filter(rating_count__gt=0)[:20]:
+            ratings = list(product.reviews.values_list('rating', flat=True))
+            self.assertEqual(product.rating_count, len(ratings))
+            self.assertEqual(product.rating_sum, sum(ratings))
+
+    def test_bulk_users(self):
+        ids = list(User.objects.exclude(pk=self.admin.pk).values_list('pk', flat=True))
+        response = self.post('users', 'make_admin', ids + [self.admin.pk])
+        self.assertEqual(response.json()['affected'], len(ids))
+        self.admin.refresh_from_db()
+        self.assertTrue(self.admin.is_superuser)
+        self.assertEqual(self.post('users', 'revoke_admin', ids).json()['affected'], len(ids))
+        self.assertFalse(User.objects.filter(pk__in=ids, role='admin').exists())
+
+    def test_bulk_validation(self):
+        self.assertEqual(self.post('products', 'drop', [1]).status_code, 400)
+        self.assertEqual(self.post('products', 'delete', []).status_code, 400)
+        self.assertEqual(self.post('reviews', 'delete', ['x']).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard:bulk_products')).status_code, 403)
+
+
+class ReportQueueBenchmarks(BenchmarkCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('bench_admin', 'admin@example.com', 'password')
+        self.other = User.objects.create_user('bench_moderator', 'mod@example.com', 'password', role='admin')
+        Report.objects.bulk_create([
+            Report(reporter=self.buyer, reported_product=self.product, report_type='spam', description=f'жалоба {i}')
+            for i in range(100)
+        ])
+        self.client.force_login(self.admin)
+
+    def test_report_queue(self):
+        claim_url = reverse('dashboard:claim_reports')
+        release = lambda: Report.objects.update(claimed_by=None, claimed_at=None)
+        self.bench('reports claim', 7, lambda: self.client.post(claim_url), setup=release)
+        self.client.post(claim_url)
+        response = self.bench('reports queue', 5, lambda: self.client.get(reverse('dashboard:report_queue')))
+        self.assertEqual(len(response.context['reports']), moderation.REPORT_BATCH)
+        self.assertEqual(response.context['pending'], 100)
+
+    def test_claims_do_not_overlap(self):
+        self.assertEqual(moderation.claim_reports(self.admin, 30), 30)
+        self.assertEqual(moderation.claim_reports(self.other, 30), 30)
+        # повторный захват только продлевает уже взятые
+        self.assertEqual(moderation.claim_reports(self.admin, 30), 0)
+        mine = set(moderation.claimed_reports(self.admin).values_list('pk', flat=True))
+        theirs = set(moderation.claimed_reports(self.other).values_list('pk', flat=True))
+        self.assertEqual((len(mine), len(theirs)), (30, 30))
+        self.assertFalse(mine & theirs)
+        # первыми выдаются самые старые
+        self.assertEqual(mine, set(Report.objects.order_by('created_at', 'pk').values_list('pk', flat=True)[:30]))
+
+        # чужие жалобы закрыть нельзя, истёкший захват возвращается в очередь
+        self.assertEqual(moderation.close_reports(theirs, 'resolved', self.admin)['affected'], 0)
+        Report.objects.filter(pk__in=theirs).update(claimed_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(moderation.claim_reports(self.admin, 60), 30)
+        self.assertTrue(theirs <= set(moderation.claimed_reports(self.admin).values_list('pk', flat=True)))
+
+    def test_bulk_resolve(self):
+        moderation.claim_reports(self.admin, 10)
+        ids = list(moderation.claimed_reports(self.admin).values_list('pk', flat=True))
+        url = reverse('dashboard:bulk_reports')
+        body = json.dumps({'action': 'resolve', 'ids': ids[:6], 'notes': 'удалено'})
+        self.assertEqual(self.client.post(url, body, content_type='application/json').json()['affected'], 6)
+        body = json.dumps({'action': 'release', 'ids': ids[6:]})
+        self.assertEqual(self.client.post(url, body, content_type='application/json').json()['affected'], 4)
+
+        resolved = Report.objects.filter(status='resolved')
+        self.assertEqual(set(resolved.values_list('pk', flat=True)), set(ids[:6]))
+        self.assertEqual(set(resolved.values_list('resolved_by', 'resolution_notes', 'claimed_by')),
+                         {(self.admin.pk, 'удалено', None)})
+        self.assertFalse(resolved.filter(resolved_at__isnull=True).exists())
+        self.assertFalse(moderation.claimed_reports(self.admin).exists())
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    # захваты в разных соединениях: SKIP LOCKED должен пропускать строки,
+    # которые другой модератор держит в незакрытой транзакции
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('claim_admin', 'admin@example.com', 'password')
+        self.other = User.objects.create_user('claim_moderator', 'mod@example.com', 'password', role='admin')
+        Report.objects.bulk_create([
+            Report(reporter=self.other, reported_user=self.admin, report_type='spam', description=f'жалоба {i}')
+            for i in range(60)
+        ])
+
+    def test_claim_skips_locked_rows(self):
+        claimed, release = threading.Event(), threading.Event()
+
+        def hold_claim():
+            try:
+                with transaction.atomic():
+                    moderation.claim_reports(self.admin, 30)
+                    claimed.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_claim)
+        holder.start()
+        self.addCleanup(holder.join)
+        self.addCleanup(release.set)
+        self.assertTrue(claimed.wait(10))
+
+        result = []
+
+        def claim():
+            try:
+                result.append(moderation.claim_reports(self.other, 30))
+            finally:
+                connection.close()
+
+        second = threading.Thread(target=claim)
+        second.start()
+        # второй захват не ждёт транзакцию первого
+        second.join(5)
+        blocked = second.is_alive()
+        release.set()
+        holder.join()
+        second.join()
+        self.assertFalse(blocked)
+        self.assertEqual(result, [30])
+
+        mine = set(moderation.claimed_reports(self.admin).values_list('pk', flat=True))
+        theirs = set(moderation.claimed_reports(self.other).values_list('pk', flat=True))
+        self.assertEqual((len(mine), len(theirs)), (30, 30))
+        self.assertFalse(mine & theirs)
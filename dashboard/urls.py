@@ -7,8 +7,16 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('users/', views.user_list, name='user_list'),
     path('users/<int:pk>/toggle-admin/', views.toggle_admin, name='toggle_admin'),
+    path('users/bulk/', views.bulk_users, name='bulk_users'),
     path('products/', views.product_list, name='product_list'),
     path('products/<int:pk>/delete/', views.delete_product, name='delete_product'),
+    path('products/bulk/', views.bulk_products, name='bulk_products'),
     path('reviews/', views.review_list, name='review_list'),
     path('reviews/<int:pk>/delete/', views.delete_review, name='delete_review'),
+    path('reviews/bulk/', views.bulk_reviews, name='bulk_reviews'),
+    path('reports/', views.report_queue, name='report_queue'),
+    path('reports/claim/', views.claim_reports, name='claim_reports'),
+    path('reports/bulk/', views.bulk_reports, name='bulk_reports'),
+    path('orders/export/', views.export_orders, name='export_orders'),
+    path('analytics/', views.analytics, name='analytics'),
 ]
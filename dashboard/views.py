@@ -1,8 +1,22 @@
+import csv
+import json
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test, login_required
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponseBadRequest, StreamingHttpResponse
 from django.urls import reverse
-from app_of_floreal_paris.models import User, Product, Review
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from app_of_floreal_paris.models import User, Product, Review, Order, Report
+from app_of_floreal_paris.search import search_products_page
+
+from . import moderation
+from .models import DailySales, ProductSales, SellerSales
 
 def is_ga(user):
     return user.is_superuser
@@ -13,7 +27,9 @@ def is_admin(user):
 @login_required
 @user_passes_test(is_admin)
 def index(request):
-    return render(request, 'index.html')
+    return render(request, 'index.html', {
+        'order_statuses': Order.STATUS_CHOICES,
+    })
 
 @login_required
 @user_passes_test(is_ga)
@@ -54,16 +70,13 @@ def product_list(request):
     """
     q = request.GET.get('q', '').strip()
     if q:
-        pattern = f'%{q}%'
-        sql = """
-            SELECT *
-              FROM app_of_floreal_paris_product
-             WHERE title ILIKE %s OR description ILIKE %s
-             ORDER BY views DESC
-        """
-        products = list(Product.objects.raw(sql, [pattern, pattern]))
+        # тот же поисковый сервис, что и на сайте, но по всем товарам
+        products = search_products_page(
+            q, request.GET.get('page'),
+            queryset=Product.objects.select_related('seller'),
+        )
     else:
-        products = Product.objects.all().order_by('-created_at')
+        products = Product.objects.select_related('seller').order_by('-created_at')
     return render(request, 'products.html', {
         'products': products,
         'query': q,
@@ -92,3 +105,233 @@ def delete_review(request, pk):
     r = get_object_or_404(Review, pk=pk)
     r.delete()
     return JsonResponse({'success': True})
+
+ORDER_EXPORT_CHUNK = 2000
+ORDER_EXPORT_FIELDS = ('id', 'transaction_id', 'created_at', 'user__username', 'status', 'total_amount')
+ORDER_EXPORT_HEADER = ('id', 'transaction_id', 'created_at', 'buyer', 'status', 'total_amount')
+REVENUE_EXPORT_HEADER = ('date', 'orders', 'revenue')
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: writerow возвращает строку, а не пишет её."""
+    def write(self, value):
+        return value
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_orders(params):
+    """
+    Фильтры выгрузки: date_from / date_to (YYYY-MM-DD, включительно), status.
+    Бросает ValueError на некорректных значениях.
+    """
+    orders = Order.objects.all()
+    # границы дней — моменты времени, а не created_at::date: так условие
+    # остаётся диапазоном по order_created_idx
+    for name, lookup, shift in (('date_from', 'created_at__gte', 0), ('date_to', 'created_at__lt', 1)):
+        value = params.get(name, '').strip()
+        if value:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"Некорректная дата {name}: {value}")
+            orders = orders.filter(**{lookup: _day_start(day + timedelta(days=shift))})
+    status = params.get('status', '').strip()
+    if status:
+        if status not in dict(Order.STATUS_CHOICES):
+            raise ValueError(f"Неизвестный статус: {status}")
+        orders = orders.filter(status=status)
+    return orders
+
+
+def export_rows(params, kind):
+    orders = filter_orders(params)
+    if kind == 'revenue':
+        # выручка по дням: агрегат считает БД, строк не больше, чем дней
+        if not params.get('status'):
+            orders = orders.exclude(status='cancelled')
+        rows = (
+            orders.annotate(day=TruncDate('created_at'))
+            .values_list('day')
+            .annotate(orders=Count('id'), revenue=Sum('total_amount'))
+            .order_by('day')
+        )
+        return REVENUE_EXPORT_HEADER, rows.iterator()
+    # values_list без создания моделей; на PostgreSQL iterator() читает
+    # серверным курсором порциями по ORDER_EXPORT_CHUNK строк
+    rows = orders.values_list(*ORDER_EXPORT_FIELDS).order_by('created_at', 'id')
+    return ORDER_EXPORT_HEADER, rows.iterator(chunk_size=ORDER_EXPORT_CHUNK)
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield '\ufeff'  # BOM, чтобы Excel открыл кириллицу
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + '\n'
+
+
+@login_required
+@user_passes_test(is_admin)
+def export_orders(request):
+    """
+    Потоковая выгрузка заказов (kind=orders) или выручки по дням (kind=revenue)
+    в CSV или JSONL. Ответ формируется по мере чтения из БД, поэтому
+    выгрузка за год не держит всё в памяти.
+    """
+    kind = request.GET.get('kind', 'orders')
+    fmt = request.GET.get('format', 'csv')
+    if kind not in ('orders', 'revenue') or fmt not in ('csv', 'jsonl'):
+        return HttpResponseBadRequest("Неизвестный тип или формат выгрузки")
+    try:
+        header, rows = export_rows(request.GET, kind)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    if fmt == 'csv':
+        response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(stream_jsonl(header, rows), content_type='application/x-ndjson; charset=utf-8')
+    filename = f"{kind}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+ANALYTICS_PERIODS = (7, 30, 90, 365)
+ANALYTICS_TOP = 10
+
+
+@login_required
+@user_passes_test(is_admin)
+def analytics(request):
+    """
+    Выручка, заказы и конверсия за период и топ продавцов/товаров. Читаются
+    только сводные таблицы (dashboard.models): не больше 365 строк по дням
+    и два топа по индексу — время не зависит от числа заказов.
+    """
+    try:
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        days = 30
+    if days not in ANALYTICS_PERIODS:
+        days = 30
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = {row.date: row for row in DailySales.objects.filter(date__gte=start, date__lte=today)}
+
+    chart, totals = [], Counter()
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day) or DailySales(date=day)
+        chart.append(row)
+        for name in ('orders', 'completed', 'cancelled', 'items_sold'):
+            totals[name] += getattr(row, name)
+        totals['revenue'] += row.revenue
+    # высоты столбиков графиков в процентах от максимума за период
+    peak_revenue = max(row.revenue for row in chart) or 1
+    peak_orders = max(row.orders for row in chart) or 1
+    for row in chart:
+        row.revenue_height = round(row.revenue / peak_revenue * 100, 1)
+        row.orders_height = round(row.orders / peak_orders * 100, 1)
+
+    return render(request, 'analytics.html', {
+        'days': days,
+        'periods': ANALYTICS_PERIODS,
+        'chart': chart,
+        'totals': totals,
+        'conversion': round(totals['completed'] / totals['orders'] * 100, 1) if totals['orders'] else None,
+        'average_check': round(totals['revenue'] / totals['completed'], 2) if totals['completed'] else None,
+        'top_sellers': SellerSales.objects.select_related('seller')
+            .only('orders', 'items_sold', 'revenue', 'seller', 'seller__username')
+            .order_by('-revenue')[:ANALYTICS_TOP],
+        'top_products': ProductSales.objects.select_related('product')
+            .only('orders', 'items_sold', 'revenue', 'product', 'product__title')
+            .order_by('-revenue')[:ANALYTICS_TOP],
+    })
+
+
+BULK_MAX_IDS = getattr(settings, 'DASHBOARD_BULK_MAX_IDS', 10000)
+BULK_ACTIONS = {
+    'products': moderation.PRODUCT_ACTIONS,
+    'reviews': moderation.REVIEW_ACTIONS,
+    'users': moderation.USER_ACTIONS,
+    'reports': moderation.REPORT_ACTIONS,
+}
+
+
+def _bulk_action(request, kind):
+    """
+    POST JSON {"action": ..., "ids": [...]} -> JSON-сводка. Все выбранные
+    строки обрабатываются одним набором запросов в одной транзакции.
+    """
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    try:
+        payload = json.loads(request.body)
+        action = payload['action']
+        ids = sorted({int(pk) for pk in payload['ids']})
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Ожидается {"action": ..., "ids": [...]}'}, status=400)
+    if action not in BULK_ACTIONS[kind]:
+        return JsonResponse({'error': f'Неизвестное действие: {action}'}, status=400)
+    if not ids or len(ids) > BULK_MAX_IDS:
+        return JsonResponse({'error': f'Выберите от 1 до {BULK_MAX_IDS} строк'}, status=400)
+    summary = moderation.run(kind, action, ids, request.user, notes=str(payload.get('notes', '')))
+    return JsonResponse({'success': True, 'action': action, 'selected': len(ids), **summary})
+
+
+@login_required
+@user_passes_test(is_admin)
+def bulk_products(request):
+    return _bulk_action(request, 'products')
+
+
+@login_required
+@user_passes_test(is_admin)
+def bulk_reviews(request):
+    return _bulk_action(request, 'reviews')
+
+
+@login_required
+@user_passes_test(is_ga)
+def bulk_users(request):
+    return _bulk_action(request, 'users')
+
+
+@login_required
+@user_passes_test(is_admin)
+def report_queue(request):
+    """Жалобы, взятые текущим модератором в работу, и размер очереди."""
+    reports = (
+        moderation.claimed_reports(request.user)
+        .select_related('reporter', 'reported_user', 'reported_product')
+        .only('report_type', 'description', 'created_at', 'claimed_at',
+              'reporter__username', 'reported_user__username', 'reported_product__title')
+        .order_by('created_at', 'pk')
+    )
+    return render(request, 'reports.html', {
+        'reports': reports,
+        'pending': Report.objects.filter(status='pending').count(),
+        'batch': moderation.REPORT_BATCH,
+        'claim_ttl': int(moderation.REPORT_CLAIM_TTL.total_seconds() // 60),
+    })
+
+
+@login_required
+@user_passes_test(is_admin)
+def claim_reports(request):
+    if request.method != 'POST':
+        return HttpResponseForbidden()
+    return JsonResponse({'success': True, 'claimed': moderation.claim_reports(request.user)})
+
+
+@login_required
+@user_passes_test(is_admin)
+def bulk_reports(request):
+    return _bulk_action(request, 'reports')
@@ -2,6 +2,8 @@
 ASGI config for manager_of_floreal_paris project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving the project through it enables the chat push stream
+(``app_of_floreal_paris.views.chat_stream``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
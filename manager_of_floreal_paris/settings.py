@@ -17,11 +17,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 AUTH_USER_MODEL = 'app_of_floreal_paris.User'
 
 MIDDLEWARE = [
+    'app_of_floreal_paris.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,4 +85,46 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
-LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'
+
+# Общий для всех процессов кэш: версии страниц и каталога (page_cache.py),
+# сводка корзины, фасеты, ответы FakeGateway. Кэш в памяти процесса не годится:
+# сброс по сигналу в одном воркере не дошёл бы до остальных, а bump_version
+# из import_products/seed_marketplace — до веб-сервера. Таблица создаётся
+# командой createcachetable. С Redis: 'django.core.cache.backends.redis.RedisCache',
+# LOCATION 'redis://127.0.0.1:6379' (нужен пакет redis).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'floreal_cache',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # imagekit проверяет наличие уменьшенной копии при каждом показе картинки;
+    # ответ храним в памяти процесса, а не лишним запросом к кэшу в БД
+    'renditions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+IMAGEKIT_CACHE_BACKEND = 'renditions'
+
+# Замеры запросов (app_of_floreal_paris/middleware.py)
+SERVER_TIMING_ENABLED = DEBUG
+SLOW_REQUEST_THRESHOLD_MS = 500
+MANY_QUERIES_THRESHOLD = 30  # такие запросы пишутся в floreal.requests уровнем INFO
+SLOW_REQUEST_LOG = None  # например BASE_DIR / 'slow_requests.jsonl'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # 'DEBUG' — строка на каждый запрос
+        'floreal.requests': {'handlers': ['console'], 'level': 'INFO' if DEBUG else 'WARNING'},
+        'floreal.slow_requests': {'handlers': ['console'], 'level': 'WARNING'},
+        'floreal.payments': {'handlers': ['console'], 'level': 'WARNING'},
+        'floreal.view_counter': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}